@@ -1,10 +1,99 @@
-from flask import Flask, render_template, jsonify, request
+from flask import (Flask, render_template, jsonify, request, Response, stream_with_context, g, has_request_context,
+                   send_from_directory)
 import os
+import re
+import sys
+import bisect
+import cProfile
+import functools
+import glob
+import gzip
+import hashlib
+import hmac
+import json
+import logging
+import operator
+import pstats
+import queue
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import click
 import pandas as pd
 import numpy as np
 
+import backtesting
+
+try:
+    import brotli  # optional, responses are also pre-compressed with brotli when installed
+except ImportError:
+    brotli = None
+
 app = Flask(__name__)
 
+# Directory holding the league CSV files
+app.config['DATA_DIR'] = os.environ.get(
+    'DATA_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+)
+
+# Directory for the binary column caches of the league CSVs (defaults to DATA_DIR/.cache)
+app.config['COLUMN_CACHE_DIR'] = os.environ.get('COLUMN_CACHE_DIR')
+
+# SQLite match store built by `flask import-matches`; leagues imported into it are read from
+# it instead of their CSV. Each worker keeps up to STORE_POOL_SIZE idle connections to it.
+app.config['MATCH_STORE'] = os.environ.get(
+    'MATCH_STORE', os.path.join(app.config['DATA_DIR'], 'matches.sqlite3')
+)
+app.config['STORE_POOL_SIZE'] = int(os.environ.get('STORE_POOL_SIZE', 4))
+
+# Approximate memory budget for formatted seasons kept per worker
+app.config['SEASON_CACHE_MB'] = float(os.environ.get('SEASON_CACHE_MB', 64))
+
+# Worker processes used to format seasons in parallel (0 or 1 formats serially), and the
+# smallest number of rows worth shipping to the pool
+app.config['FORMAT_WORKERS'] = int(os.environ.get('FORMAT_WORKERS', 0))
+app.config['PARALLEL_MIN_ROWS'] = int(os.environ.get('PARALLEL_MIN_ROWS', 2000))
+
+# Threads loading and formatting leagues side by side for /combined, and the longest date
+# range (in days) it accepts
+app.config['COMBINED_WORKERS'] = int(os.environ.get('COMBINED_WORKERS', 6))
+app.config['COMBINED_MAX_DAYS'] = int(os.environ.get('COMBINED_MAX_DAYS', 31))
+
+# Shared secret for POST /ingest/<league> (sent as X-Ingest-Token); ingest is disabled when unset
+app.config['INGEST_TOKEN'] = os.environ.get('INGEST_TOKEN')
+
+# Level of app.logger. Each request's stage timings are logged at DEBUG, or at WARNING when
+# the request takes at least SLOW_REQUEST_MS, so INFO stays quiet on the hot path.
+app.config['LOG_LEVEL'] = os.environ.get('LOG_LEVEL', 'INFO').upper()
+app.config['SLOW_REQUEST_MS'] = float(os.environ.get('SLOW_REQUEST_MS', 1000))
+app.logger.setLevel(app.config['LOG_LEVEL'])
+
+# On-demand profiling of /get_data and /arranged: when PROFILING is on, a request sent with an
+# X-Profile header or profile query flag (equal to PROFILE_TOKEN when that is set) runs under
+# cProfile. The PROFILE_KEEP most recent profiles are kept in PROFILE_DIR (default DATA_DIR/.profiles)
+# and served by /profiles, which asks for the same token.
+app.config['PROFILING'] = os.environ.get('PROFILING') == '1'
+app.config['PROFILE_TOKEN'] = os.environ.get('PROFILE_TOKEN')
+app.config['PROFILE_DIR'] = os.environ.get('PROFILE_DIR')
+app.config['PROFILE_KEEP'] = int(os.environ.get('PROFILE_KEEP', 50))
+
+# League name (as sent by the frontend) -> CSV file in DATA_DIR
+LEAGUE_FILES = {
+    "English Premier League": "EnglishPremierLeague.csv",
+    "German Bundesliga": "GermanBundesliga.csv",
+    "Italian Serie A": "ItalySerieA.csv",
+    "Turkish Super League": "TurkishSuperLeague.csv",
+    "Portugal Primeira League": "GoodPortugal.csv",
+    "Spanish La Liga": "SpanishLaLiga.csv"
+}
+LEAGUE_BY_FILE = {file_name: league for league, file_name in LEAGUE_FILES.items()}
+
 # Demo data for arranged page
 app.matchday_answers = {
     '2024-2025-01': {'answer': {'H': 5, 'A': 3, 'D': 2}},
@@ -13,77 +102,782 @@ app.matchday_answers = {
     '2024-2025-04': {'answer': {'H': 3, 'A': 5, 'D': 2}},
     '2024-2025-05': {'answer': {'H': 4, 'A': 3, 'D': 3}},
 }
+# League the current matchday_answers were built from
+app.matchday_answers_league = None
+
+@contextmanager
+def timed(stage):
+    """Add the time spent in the block to the current request's stage timings (see log_request)"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if has_request_context():
+            timings = g.setdefault('timings', {})
+            timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - started
+
+def format_fields(fields):
+    """Render structured log fields as key=value pairs, quoting text with spaces"""
+    return ' '.join(f"{key}={json.dumps(value) if isinstance(value, str) and ' ' in value else value}"
+                    for key, value in fields.items())
+
+def get_file_signature(file_path):
+    """Return (mtime_ns, size) for a file, used to detect changes on disk"""
+    stat = os.stat(file_path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+# Columns every league file must have; the other schema columns are optional
+REQUIRED_COLUMNS = ['Date', 'MD', 'Home', 'Away', 'FTR', 'hScre', 'Season']
+
+# Canonical league frame: every file is loaded into exactly these columns and dtypes.
+# '-', blanks and -1 goals become missing values; hScre ("3-1") is split into hHomeG/hAwayG.
+LEAGUE_SCHEMA = {
+    'Date': 'datetime64',
+    'MD': 'Int16',
+    'Home': 'category',
+    'Away': 'category',
+    'FTR': 'Int8',
+    'HomeG': 'Int16',
+    'AwayG': 'Int16',
+    'HmOd': 'float32',
+    'DrOd': 'float32',
+    'AwOd': 'float32',
+    'Season': 'category',
+    'hHome': 'category',
+    'hAway': 'category',
+    'hHomeG': 'Int16',
+    'hAwayG': 'Int16',
+    'hRnd': 'Int16'
+}
+ODDS_COLUMNS = ['HmOd', 'DrOd', 'AwOd']
+GOAL_COLUMNS = ['HomeG', 'AwayG']
+MISSING_MARKERS = ['-', '']
+
+# Other spellings of a club (mostly in the h2h reference columns) -> the name its fixtures use
+TEAM_ALIASES = {
+    'AFC Bournemouth': 'Bournemouth',
+    'Brighton Hove Albion': 'Brighton',
+    'Borussia Monchengladbach': "Borussia M'gladbach",
+    'FC Koln': 'FC Cologne',
+    'FSV Mainz 05': 'Mainz 05',
+    'Heidenheimer': 'Heidenheim',
+    'SC Freiburg': 'Freiburg',
+    'TSG Hoffenheim': 'Hoffenheim',
+    'VfL Wolfsburg': 'Wolfsburg',
+    'Inter Milan': 'Inter',
+    'Verona': 'Hellas Verona',
+    'AVS': 'AVS Futebol SAD',
+    'Boavista': 'Boavista FC',
+    'Braga': 'SC Braga',
+    'Casa Pia': 'Casa Pia AC',
+    'Guimaraes': 'Vitoria de Guimaraes',
+    'SC Farense': 'Farense',
+    'Sporting': 'Sporting CP',
+    'Alaves': 'Deportivo Alaves',
+    'Athletic Bilbao': 'Athletic Club',
+    'FC Barcelona': 'Barcelona',
+    'RCD Espanyol': 'Espanyol',
+    'Real oviedo': 'Real Oviedo'
+}
+
+# Odds are stored as float32 and rounded back to this many decimals when read
+ODDS_DECIMALS = 3
+
+class LeagueDataError(ValueError):
+    """A league file (or ingested rows) that cannot be mapped to the canonical schema"""
+
+def clean_text(values):
+    """Stripped text values; blanks and '-' become missing"""
+    text = values.astype('string').str.strip()
+    return text.mask(text.isin(MISSING_MARKERS))
+
+def parse_season(values):
+    """Canonical "2024-2025" season names; accepts forms like Season20242025 or 2024/2025"""
+    text = clean_text(values)
+    names = {value: None for value in text.dropna().unique()}
+    for value in names:
+        years = re.fullmatch(r'\D*(\d{4})\D?(\d{4})', value)
+        names[value] = f"{years[1]}-{years[2]}" if years else None
+    return text.map(names)
+
+def canonical_team(name):
+    """The name a club's fixtures use, for any of its spellings"""
+    name = name.strip()
+    return TEAM_ALIASES.get(name, name)
+
+def count_unparsed(raw, parsed):
+    """Number of values present in the file that could not be parsed (missing markers excluded)"""
+    return int((clean_text(raw).notna() & parsed.isna()).sum())
+
+def normalize_league_frame(df, required=REQUIRED_COLUMNS):
+    """Map a raw league frame to LEAGUE_SCHEMA in one pass, ordered by kick-off (ties keep file order).
+
+    Returns (frame, problems), where problems lists the values that could
+    not be parsed and were loaded as missing. Missing required columns raise
+    LeagueDataError up front; missing optional columns are loaded as all
+    missing.
+    """
+    missing_columns = [col for col in required if col not in df.columns]
+    if missing_columns:
+        raise LeagueDataError(f"Missing required columns: {missing_columns}")
+    raw = df.reindex(columns=list(dict.fromkeys(list(LEAGUE_SCHEMA) + ['hScre'])))
+    columns = {}
+    problems = {}
+    
+    columns['Date'] = pd.to_datetime(raw['Date'], errors='coerce')
+    problems['Date'] = count_unparsed(raw['Date'], columns['Date'])
+    columns['Season'] = parse_season(raw['Season']).astype('category')
+    problems['Season'] = count_unparsed(raw['Season'], columns['Season'])
+    for column in ['Home', 'Away', 'hHome', 'hAway']:
+        columns[column] = clean_text(raw[column]).replace(TEAM_ALIASES).astype('category')
+    
+    ftr = raw['FTR'].replace({'H': 1, 'A': 2, 'D': 0})
+    for column in ['MD', 'FTR', 'HomeG', 'AwayG', 'hRnd']:
+        numbers = pd.to_numeric(ftr if column == 'FTR' else raw[column], errors='coerce')
+        present = raw[column]
+        if column in GOAL_COLUMNS:
+            # -1 marks a match that has not been played yet
+            present = present.mask(numbers == -1)
+            numbers = numbers.mask(numbers == -1)
+        valid = (numbers == numbers.round()) & (numbers >= 0)
+        if column == 'FTR':
+            valid &= numbers <= 2
+        columns[column] = numbers.where(valid).astype(LEAGUE_SCHEMA[column])
+        problems[column] = count_unparsed(present, columns[column])
+    
+    for column in ODDS_COLUMNS:
+        columns[column] = pd.to_numeric(raw[column], errors='coerce').astype(np.float32)
+        problems[column] = count_unparsed(raw[column], columns[column])
+    
+    # Head-to-head reference score "home-away"
+    h_score = raw['hScre'].astype('string').str.extract(r'^\s*(\d+)\s*-\s*(\d+)\s*$')
+    columns['hHomeG'] = pd.to_numeric(h_score[0]).astype(LEAGUE_SCHEMA['hHomeG'])
+    columns['hAwayG'] = pd.to_numeric(h_score[1]).astype(LEAGUE_SCHEMA['hAwayG'])
+    problems['hScre'] = count_unparsed(raw['hScre'], columns['hHomeG'])
+    
+    frame = pd.DataFrame({column: columns[column] for column in LEAGUE_SCHEMA})
+    problems = [f"{column}: {count} unparsable value{'s' if count > 1 else ''} loaded as missing"
+                for column, count in problems.items() if count]
+    return frame.sort_values('Date', kind='stable').reset_index(drop=True), problems
+
+def get_odds(df):
+    """Home, draw and away odds as float64 arrays, rounded back from their float32 storage"""
+    return [np.round(df[column].to_numpy(dtype=np.float64, na_value=np.nan), ODDS_DECIMALS)
+            for column in ODDS_COLUMNS]
+
+def played_mask(df):
+    """Matches that have a result and, when the league records goals, their goals"""
+    played = df['FTR'].notna()
+    if df['HomeG'].notna().any():
+        played &= df['HomeG'].notna() & df['AwayG'].notna()
+    return played
+
+# Bump when the on-disk column layout changes so existing caches get rebuilt
+COLUMN_CACHE_VERSION = 4
+
+def get_column_cache_dir(file_path, signature):
+    """Return (cache root, versioned cache directory) for a league file"""
+    root = app.config['COLUMN_CACHE_DIR'] or os.path.join(os.path.dirname(file_path), '.cache')
+    stem = os.path.splitext(os.path.basename(file_path))[0]
+    name = f"{stem}-{'-'.join(map(str, signature))}-v{COLUMN_CACHE_VERSION}"
+    return root, os.path.join(root, name)
+
+def write_column_cache(df, cache_dir, problems=()):
+    """Write a normalized frame as one .npy file per column plus a JSON manifest.
+
+    The cache is built in a temporary directory and renamed into place, so
+    readers (including other gunicorn workers) never see a partial cache.
+    """
+    tmp_dir = f"{cache_dir}.tmp-{os.getpid()}-{threading.get_ident()}"
+    os.makedirs(tmp_dir)
+    try:
+        manifest = {'rows': len(df), 'columns': [], 'problems': list(problems)}
+        for i, column in enumerate(df.columns):
+            series = df[column]
+            entry = {'name': column, 'file': f"{i}.npy"}
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                entry['kind'] = 'category'
+                entry['categories'] = series.cat.categories.tolist()
+                np.save(os.path.join(tmp_dir, entry['file']), series.cat.codes.to_numpy())
+            elif isinstance(series.dtype, pd.api.extensions.ExtensionDtype):
+                entry['kind'] = 'nullable'
+                entry['mask'] = f"{i}.mask.npy"
+                # Missing values are stored as 0 under the mask
+                np.save(os.path.join(tmp_dir, entry['file']),
+                        series.to_numpy(dtype=series.dtype.numpy_dtype, na_value=0))
+                np.save(os.path.join(tmp_dir, entry['mask']), series.isna().to_numpy())
+            else:
+                entry['kind'] = 'array'
+                np.save(os.path.join(tmp_dir, entry['file']), series.to_numpy())
+            manifest['columns'].append(entry)
+        with open(os.path.join(tmp_dir, 'manifest.json'), 'w') as f:
+            json.dump(manifest, f)
+        os.rename(tmp_dir, cache_dir)
+    except OSError:
+        # Another worker may have finished the same cache first
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        if not os.path.isdir(cache_dir):
+            raise
+
+def read_column_cache(cache_dir):
+    """Load a column cache, memory-mapping the numeric columns; returns (df, problems)"""
+    with open(os.path.join(cache_dir, 'manifest.json')) as f:
+        manifest = json.load(f)
+    columns = {}
+    for entry in manifest['columns']:
+        values = np.load(os.path.join(cache_dir, entry['file']), mmap_mode='r')
+        if entry['kind'] == 'category':
+            columns[entry['name']] = pd.Categorical.from_codes(values, categories=entry['categories'])
+        elif entry['kind'] == 'nullable':
+            mask = np.load(os.path.join(cache_dir, entry['mask']), mmap_mode='r')
+            columns[entry['name']] = pd.arrays.IntegerArray(values, mask)
+        else:
+            columns[entry['name']] = values
+    return pd.DataFrame(columns, copy=False), manifest['problems']
 
-def get_team_position(team, date, df):
-    """Calculate team's points based on completed matches before the current matchday in the same season."""
+def read_league_file(file_path, signature):
+    """Return (normalized frame, problems) for a league through its column cache.
+
+    On a cache miss the frame is read from the match store (for a 'store'
+    signature) or parsed from the CSV, then written to the cache and
+    returned memory-mapped from it.
+    """
+    root, cache_dir = get_column_cache_dir(file_path, signature)
+    if os.path.isdir(cache_dir):
+        try:
+            with timed('load'):
+                return read_column_cache(cache_dir)
+        except Exception as e:
+            app.logger.warning("Error reading column cache %s: %s", cache_dir, e)
+    
+    if signature[0] == 'store':
+        with timed('load'):
+            df, problems = match_store.read_league(get_file_league(file_path))
+    else:
+        with timed('load'):
+            raw = pd.read_csv(file_path)
+        with timed('normalize'):
+            df, problems = normalize_league_frame(raw)
+        for problem in problems:
+            app.logger.warning("%s: %s", os.path.basename(file_path), problem)
     try:
-        # Get the season from the current date
-        current_season = df[df['Date'] == date]['Season'].iloc[0]
+        os.makedirs(root, exist_ok=True)
+        write_column_cache(df, cache_dir, problems)
+        # Drop caches built from older versions of the CSV
+        stem = os.path.splitext(os.path.basename(file_path))[0]
+        for stale_dir in glob.glob(os.path.join(root, f"{stem}-*")):
+            if stale_dir != cache_dir and '.tmp-' not in stale_dir:
+                shutil.rmtree(stale_dir, ignore_errors=True)
+        return read_column_cache(cache_dir)
+    except Exception as e:
+        app.logger.warning("Error writing column cache %s: %s", cache_dir, e)
+        return df, problems
+
+# SQL type of each LEAGUE_SCHEMA column in the match store
+STORE_TYPES = {'datetime64': 'TEXT', 'category': 'TEXT', 'float32': 'REAL'}
+STORE_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+# Format of the stored frames (PRAGMA user_version); stores written by another version are
+# ignored until the leagues are imported again
+STORE_VERSION = 3
+
+STORE_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS leagues (
+        league TEXT PRIMARY KEY,
+        file TEXT NOT NULL,
+        revision INTEGER NOT NULL,
+        imported_ns INTEGER NOT NULL,
+        csv_mtime_ns INTEGER NOT NULL,
+        csv_size INTEGER NOT NULL,
+        problems TEXT NOT NULL
+    )""",
+    """CREATE TABLE IF NOT EXISTS matches (
+        league TEXT NOT NULL,
+        row INTEGER NOT NULL,
+        %s,
+        PRIMARY KEY (league, row)
+    )""" % ',\n        '.join(f"{column} {STORE_TYPES.get(dtype, 'INTEGER')}"
+                                for column, dtype in LEAGUE_SCHEMA.items()),
+    "CREATE INDEX IF NOT EXISTS matches_matchday ON matches (league, Season, MD)",
+    "CREATE INDEX IF NOT EXISTS matches_home_date ON matches (league, Home, Date)",
+    "CREATE INDEX IF NOT EXISTS matches_away_date ON matches (league, Away, Date)",
+    "CREATE INDEX IF NOT EXISTS matches_odds ON matches (HmOd, DrOd, AwOd)"
+]
+
+class ConnectionPool:
+    """A few read-only SQLite connections per worker process.
+
+    Connections are opened on demand and up to `size` idle ones are kept.
+    Idle connections inherited from the gunicorn master are dropped after a
+    fork instead of being shared with it.
+    """
+    
+    def __init__(self, path, size):
+        self.path = path
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._pid = os.getpid()
+    
+    @contextmanager
+    def connection(self):
+        if self._pid != os.getpid():
+            self._idle = queue.LifoQueue()
+            self._pid = os.getpid()
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+        try:
+            yield conn
+        finally:
+            if self._idle.qsize() < self.size:
+                self._idle.put(conn)
+            else:
+                conn.close()
+    
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+class MatchStore:
+    """Normalized league frames (as read_league_file returns them) in one SQLite file.
+
+    The store is filled by `flask import-matches` and indexed by (league,
+    Season, MD), (league, team, Date) and the odds, so matches by matchday,
+    team or date range are read without loading the league. A league's
+    signature is its import revision, which takes the place of the CSV's
+    mtime and size in the data version. The CSV's signature is recorded at
+    import; once the CSV changes, the league is read from the CSV again
+    until it is re-imported.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pool = None
+        self._stale = set()  # (league, CSV signature) already warned about
+    
+    @property
+    def path(self):
+        return app.config['MATCH_STORE']
+    
+    def available(self):
+        return bool(self.path) and os.path.exists(self.path)
+    
+    def connection(self):
+        with self._lock:
+            if self._pool is None or self._pool.path != self.path:
+                if self._pool is not None:
+                    self._pool.close()
+                self._pool = ConnectionPool(self.path, app.config['STORE_POOL_SIZE'])
+            return self._pool.connection()
+    
+    def signature(self, league):
+        """('store', revision, import time) of an imported league, or None.
+
+        None also when the league's CSV has changed since it was imported,
+        so the CSV is read instead of the outdated import.
+        """
+        if not self.available():
+            return None
+        try:
+            with self.connection() as conn:
+                if conn.execute("PRAGMA user_version").fetchone()[0] != STORE_VERSION:
+                    return None
+                row = conn.execute("SELECT revision, imported_ns, csv_mtime_ns, csv_size FROM leagues "
+                                   "WHERE league = ?", (league,)).fetchone()
+        except sqlite3.Error:
+            return None
+        if row is None:
+            return None
+        file_path = get_league_path(league)
+        if os.path.exists(file_path):
+            csv_signature = get_file_signature(file_path)
+            if csv_signature != (row[2], row[3]):
+                if (league, csv_signature) not in self._stale:
+                    self._stale.add((league, csv_signature))
+                    app.logger.warning("%s changed since it was imported into the match store; reading the CSV "
+                                       "until it is imported again", os.path.basename(file_path))
+                return None
+        return ('store', row[0], row[1])
+    
+    def read_league(self, league):
+        """Return (normalized frame, problems) of an imported league in one bulk read"""
+        with self.connection() as conn:
+            rows = conn.execute(f"SELECT {', '.join(LEAGUE_SCHEMA)} FROM matches WHERE league = ? ORDER BY row",
+                                (league,)).fetchall()
+            problems = conn.execute("SELECT problems FROM leagues WHERE league = ?", (league,)).fetchone()
+        return store_rows_to_frame(rows, list(LEAGUE_SCHEMA)), json.loads(problems[0]) if problems else []
+    
+    def query_matches(self, league, columns=None, season=None, team=None, start=None, end=None, md=None):
+        """Matches of an imported league filtered on indexed columns, in league order.
+
+        `team` matches either side; `start`/`end` bound the kick-off
+        (inclusive). Returns a frame with LEAGUE_SCHEMA dtypes.
+        """
+        columns = list(columns or LEAGUE_SCHEMA)
+        conditions, params = ["league = ?"], [league]
+        if season:
+            conditions.append("Season = ?")
+            params.append(season)
+        if md is not None:
+            conditions.append("MD = ?")
+            params.append(int(md))
+        if team:
+            conditions.append("(Home = ? OR Away = ?)")
+            params.extend([team, team])
+        if start is not None:
+            conditions.append("Date >= ?")
+            params.append(pd.Timestamp(start).strftime(STORE_DATE_FORMAT))
+        if end is not None:
+            conditions.append("Date <= ?")
+            params.append(pd.Timestamp(end).strftime(STORE_DATE_FORMAT))
+        with self.connection() as conn:
+            rows = conn.execute(f"SELECT {', '.join(columns)} FROM matches WHERE {' AND '.join(conditions)} "
+                                f"ORDER BY row", params).fetchall()
+        return store_rows_to_frame(rows, columns)
+    
+    def import_league(self, league, file_name, df, problems, csv_signature):
+        """Replace a league's matches with a normalized frame in one transaction; returns its revision.
+
+        `csv_signature` is the (mtime_ns, size) of the CSV the frame was read from.
+        """
+        conn = sqlite3.connect(self.path)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                if conn.execute("PRAGMA user_version").fetchone()[0] != STORE_VERSION:
+                    # Leagues imported in an older format are dropped rather than served
+                    conn.execute("DROP TABLE IF EXISTS matches")
+                    conn.execute("DROP TABLE IF EXISTS leagues")
+                    conn.execute(f"PRAGMA user_version = {STORE_VERSION}")
+                for statement in STORE_SCHEMA:
+                    conn.execute(statement)
+                conn.execute("DELETE FROM matches WHERE league = ?", (league,))
+                values = [frame_column_to_store(df[column]) for column in LEAGUE_SCHEMA]
+                conn.executemany(
+                    f"INSERT INTO matches (league, row, {', '.join(LEAGUE_SCHEMA)}) "
+                    f"VALUES (?, ?, {', '.join('?' * len(LEAGUE_SCHEMA))})",
+                    ((league, row, *record) for row, record in enumerate(zip(*values)))
+                )
+                conn.execute(
+                    "INSERT INTO leagues (league, file, revision, imported_ns, csv_mtime_ns, csv_size, problems) "
+                    "VALUES (?, ?, 1, ?, ?, ?, ?) "
+                    "ON CONFLICT (league) DO UPDATE SET file = excluded.file, revision = revision + 1, "
+                    "imported_ns = excluded.imported_ns, csv_mtime_ns = excluded.csv_mtime_ns, "
+                    "csv_size = excluded.csv_size, problems = excluded.problems",
+                    (league, file_name, time.time_ns(), *csv_signature, json.dumps(list(problems)))
+                )
+            return conn.execute("SELECT revision FROM leagues WHERE league = ?", (league,)).fetchone()[0]
+        finally:
+            conn.close()
+
+def frame_column_to_store(series):
+    """Values of a normalized column as SQLite values (None for missing)"""
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        series = series.dt.strftime(STORE_DATE_FORMAT)
+    values = series.astype(object)
+    return values.where(series.notna(), None).tolist()
+
+def store_rows_to_frame(rows, columns):
+    """Build a frame with LEAGUE_SCHEMA dtypes from rows read from the match store"""
+    values = list(zip(*rows)) if rows else [()] * len(columns)
+    frame = {}
+    for column, column_values in zip(columns, values):
+        dtype = LEAGUE_SCHEMA[column]
+        if dtype == 'datetime64':
+            frame[column] = pd.to_datetime(pd.Series(column_values, dtype=object), format=STORE_DATE_FORMAT)
+        elif dtype == 'category':
+            frame[column] = pd.Categorical(column_values)
+        elif dtype == 'float32':
+            frame[column] = np.array(column_values, dtype=np.float64).astype(np.float32)
+        else:
+            frame[column] = pd.array(column_values, dtype=dtype)
+    return pd.DataFrame(frame, columns=columns)
+
+match_store = MatchStore()
+
+def get_file_league(file_path):
+    """League name of a league file path, or None"""
+    return LEAGUE_BY_FILE.get(os.path.basename(file_path))
+
+def get_data_signature(file_path):
+    """Signature of a league's data: its store import, or else its CSV's (mtime_ns, size)"""
+    signature = match_store.signature(get_file_league(file_path))
+    return signature if signature is not None else get_file_signature(file_path)
+
+def league_data_exists(file_path):
+    """True when a league can be loaded, from the match store or its CSV"""
+    return os.path.exists(file_path) or match_store.signature(get_file_league(file_path)) is not None
+
+class LeagueCache:
+    """Process-wide cache of parsed league DataFrames keyed by file path.
+
+    An entry is reused until the league's data signature changes (the CSV's
+    mtime or size, or a new import into the match store). Cached frames
+    are shared between requests, so callers must not modify them in place;
+    ingested matches replace the frame and bump the entry's revision instead.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}  # {file_path: (signature, df, revision)}
+        self._problems = {}  # {file_path: values that could not be parsed when the file was loaded}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, file_path):
+        signature = get_data_signature(file_path)
+        with self._lock:
+            entry = self._entries.get(file_path)
+            if entry is not None and entry[0] == signature:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        # Load outside the lock so other leagues are not blocked meanwhile
+        df, problems = read_league_file(file_path, signature)
+        with self._lock:
+            self._entries[file_path] = (signature, df, 0)
+            self._problems[file_path] = problems
+        return df
+
+    def version(self, file_path):
+        """Data version of a file: its signature plus the number of ingests applied in memory"""
+        signature = get_data_signature(file_path)
+        with self._lock:
+            entry = self._entries.get(file_path)
+            revision = entry[2] if entry is not None and entry[0] == signature else 0
+        return (signature, revision)
+
+    def update(self, file_path, df, version):
+        """Replace the frame loaded at `version` with an updated one; returns the new version"""
+        with self._lock:
+            entry = self._entries.get(file_path)
+            if entry is None or (entry[0], entry[2]) != version:
+                raise RuntimeError(f"{os.path.basename(file_path)} changed while it was being updated")
+            self._entries[file_path] = (entry[0], df, entry[2] + 1)
+            return (entry[0], entry[2] + 1)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._problems.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(self._entries),
+                'files': [os.path.basename(path) for path in self._entries],
+                'problems': {os.path.basename(path): problems for path, problems in self._problems.items() if problems}
+            }
+
+league_cache = LeagueCache()
+
+def get_league_path(league):
+    """Return the CSV path for a league name, or None for unknown leagues"""
+    if league not in LEAGUE_FILES:
+        return None
+    return os.path.join(app.config['DATA_DIR'], LEAGUE_FILES[league])
+
+def load_league(league):
+    """Return the cached DataFrame for a league (raises FileNotFoundError if missing)"""
+    file_path = get_league_path(league)
+    if file_path is None:
+        raise KeyError(league)
+    return league_cache.get(file_path)
+
+def league_version(league, *args):
+    """Data version of one league; further arguments (such as a season) share the league's version"""
+    return league_cache.version(get_league_path(league))
+
+def get_data_version():
+    """Data version of every league; changes whenever any league's data changes"""
+    version = []
+    for league in LEAGUE_FILES:
+        file_path = get_league_path(league)
+        version.append(league_cache.version(file_path) if league_data_exists(file_path) else None)
+    return tuple(version)
+
+def memoize_by_version(version):
+    """Memoize a function of league data per argument tuple until `version(*args)` changes.
+
+    Use league_version for values built from one league and get_data_version
+    for values built from every league. Concurrent calls with the same
+    arguments build the value once; calls with other arguments are not
+    blocked meanwhile.
+    """
+    def decorator(build):
+        entries = {}  # {args: (data version, value)}
+        build_locks = {}  # {args: lock held while that value is built}
+        lock = threading.Lock()
         
-        # Get all matches before the current date in the same season
-        past_matches = df[
-            (df['Date'] < date) & 
-            (df['Season'] == current_season)
-        ]
+        @functools.wraps(build)
+        def get(*args):
+            current = version(*args)
+            with lock:
+                entry = entries.get(args)
+                if entry is not None and entry[0] == current:
+                    return entry[1]
+                build_lock = build_locks.setdefault(args, threading.Lock())
+            with build_lock:
+                with lock:
+                    entry = entries.get(args)
+                    if entry is not None and entry[0] == current:
+                        return entry[1]
+                value = build(*args)
+                with lock:
+                    entries[args] = (current, value)
+            return value
+        
+        return get
+    return decorator
+
+class TeamTimeline:
+    """Point-in-time table stats for every (season, team) of one league.
+
+    Each team's played matches are stored in date order with running totals
+    of points, goals and the latest result, so "as of date X" is a binary
+    search instead of a scan over the league. Rows are keyed by
+    group id * KEY_RADIX + seconds since epoch, which lets one searchsorted
+    call answer a whole batch of (team, date) queries.
+    """
+
+    KEY_RADIX = 1 << 34
+    KEY_OFFSET = 1 << 33  # keeps pre-1970 dates positive
+
+    def __init__(self, df):
+        df = df[df['Date'].notna() & df['Home'].notna() & df['Away'].notna() & played_mask(df)]
+        ftr = df['FTR'].to_numpy(dtype=np.int64)
+        # Leagues without goal columns count every match as 0-0
+        home_goals = df['HomeG'].fillna(0).to_numpy(dtype=np.int64)
+        away_goals = df['AwayG'].fillna(0).to_numpy(dtype=np.int64)
         
-        # Initialize points
-        points = 0
-        
-        # Calculate points from past matches
-        for _, match in past_matches.iterrows():
-            if match['Home'] == team:
-                if match['FTR'] == '1':  # Home win
-                    points += 3
-                elif match['FTR'] == '0':  # Draw
-                    points += 1
-            elif match['Away'] == team:
-                if match['FTR'] == '2':  # Away win
-                    points += 3
-                elif match['FTR'] == '0':  # Draw
-                    points += 1
-        
-        return points
+        seasons = df['Season'].astype(str).to_numpy()
+        dates = df['Date'].to_numpy(dtype='datetime64[s]')
+        long = pd.DataFrame({
+            'season': np.concatenate([seasons, seasons]),
+            'team': np.concatenate([df['Home'].astype(str).to_numpy(), df['Away'].astype(str).to_numpy()]),
+            'date': np.concatenate([dates, dates]),
+            'points': np.concatenate([np.select([ftr == 1, ftr == 0], [3, 1], 0),
+                                      np.select([ftr == 2, ftr == 0], [3, 1], 0)]),
+            'goals_scored': np.concatenate([home_goals, away_goals]),
+            'goals_conceded': np.concatenate([away_goals, home_goals]),
+            'result': np.concatenate([np.select([ftr == 1, ftr == 2], ['W', 'L'], 'D'),
+                                      np.select([ftr == 2, ftr == 1], ['W', 'L'], 'D')]),
+            'location': np.repeat(['H', 'A'], len(df))
+        })
+        group_ids, groups = pd.factorize(pd.MultiIndex.from_arrays([long['season'], long['team']]))
+        long['group'] = group_ids
+        long = long.sort_values(['group', 'date'], kind='stable').reset_index(drop=True)
+        
+        totals = long.groupby('group')[['points', 'goals_scored', 'goals_conceded']].cumsum()
+        self.groups = {key: i for i, key in enumerate(groups)}
+        self.keys = self._make_keys(long['group'].to_numpy(), long['date'].to_numpy())
+        self.group_of = long['group'].to_numpy()
+        self.played = long.groupby('group').cumcount().to_numpy() + 1
+        self.points = totals['points'].to_numpy()
+        self.goals_scored = totals['goals_scored'].to_numpy()
+        self.goals_conceded = totals['goals_conceded'].to_numpy()
+        self.results = long['result'].to_numpy()
+        self.locations = long['location'].to_numpy()
+        
+        # First and last match date of each season, to find the season of a date
+        spans = pd.DataFrame({'season': seasons, 'date': dates}).groupby('season')['date'].agg(['min', 'max'])
+        self.season_spans = spans.sort_values('min')
+        self.teams_by_season = long.groupby('season')['team'].unique().to_dict()
+
+    def _make_keys(self, group_ids, dates):
+        seconds = np.asarray(dates, dtype='datetime64[s]').astype(np.int64)
+        return np.asarray(group_ids, dtype=np.int64) * self.KEY_RADIX + seconds + self.KEY_OFFSET
+
+    def seasons_at(self, dates):
+        """Season whose matches span each date (or the latest season started before it)"""
+        starts = self.season_spans['min'].to_numpy()
+        positions = np.searchsorted(starts, np.asarray(dates, dtype='datetime64[s]'), side='right') - 1
+        names = self.season_spans.index.to_numpy(dtype=object)
+        return [names[i] if i >= 0 else None for i in positions.tolist()]
+
+    def season_at(self, date):
+        return self.seasons_at(np.array([pd.Timestamp(date)], dtype='datetime64[s]'))[0]
+
+    def _last_rows(self, group_ids, dates):
+        """Row of each group's last match strictly before the date, or -1"""
+        keys = self._make_keys(group_ids, dates)
+        rows = np.searchsorted(self.keys, keys, side='left') - 1
+        found = (rows >= 0) & (group_ids >= 0)
+        found[found] &= self.group_of[rows[found]] == group_ids[found]
+        return np.where(found, rows, -1)
+
+    def query(self, teams, dates, seasons=None):
+        """Batch lookup of each team's totals before each date.
+
+        `seasons` defaults to the season each date falls in. Returns a
+        DataFrame with one row per query: played, points, goals_scored,
+        goals_conceded, last_result and last_location.
+        """
+        dates = pd.to_datetime(pd.Series(dates)).to_numpy(dtype='datetime64[s]')
+        if seasons is None:
+            seasons = self.seasons_at(dates)
+        group_ids = np.array([self.groups.get((season, team), -1) for season, team in zip(seasons, teams)],
+                             dtype=np.int64)
+        rows = self._last_rows(group_ids, dates)
+        found = rows >= 0
+        safe_rows = np.where(found, rows, 0)
+        
+        def pick(values, default):
+            return np.where(found, values[safe_rows] if len(values) else default, default)
+        
+        return pd.DataFrame({
+            'team': list(teams),
+            'season': list(seasons),
+            'date': dates,
+            'played': pick(self.played, 0),
+            'points': pick(self.points, 0),
+            'goals_scored': pick(self.goals_scored, 0),
+            'goals_conceded': pick(self.goals_conceded, 0),
+            'last_result': pick(self.results.astype(object), None),
+            'last_location': pick(self.locations.astype(object), None)
+        })
+
+    def lookup(self, team, date, season=None):
+        """Single (team, date) lookup; returns the row index of the last match before date, or -1"""
+        if season is None:
+            season = self.season_at(date)
+        group_id = self.groups.get((season, team))
+        if group_id is None:
+            return -1
+        return int(self._last_rows(np.array([group_id]), np.array([pd.Timestamp(date)], dtype='datetime64[s]'))[0])
+
+@memoize_by_version(league_version)
+def get_team_timeline(league):
+    """Return the TeamTimeline for a league, rebuilt when its data changes"""
+    return TeamTimeline(load_league(league))
+
+def get_team_position(team, date, league):
+    """Calculate team's points based on completed matches before the given date in the same season."""
+    try:
+        timeline = get_team_timeline(league)
+        row = timeline.lookup(team, date)
+        return int(timeline.points[row]) if row >= 0 else 0
     except Exception as e:
-        print(f"Error calculating team points for {team}: {str(e)}")
+        app.logger.error("Error calculating team points for %s: %s", team, e)
         return 0
 
-def get_previous_game_result(df, team, current_date, current_season):
+def get_previous_game_result(league, team, current_date, current_season):
     """Get team's previous game result and location"""
     try:
-        # Get all matches up to the current date
-        past_matches = df[
-            (df['Season'] == current_season) & 
-            (df['Date'] < current_date) &
-            ((df['Home'] == team) | (df['Away'] == team))
-        ].sort_values('Date', ascending=False)
-        
-        if past_matches.empty:
+        timeline = get_team_timeline(league)
+        row = timeline.lookup(team, current_date, current_season)
+        if row < 0:
             return None, None
-        
-        last_game = past_matches.iloc[0]
-        was_home = last_game['Home'] == team
-        ftr = last_game['FTR']
-        
-        # Determine result
-        if was_home:
-            if ftr == '1':
-                result = 'W'
-            elif ftr == '2':
-                result = 'L'
-            else:
-                result = 'D'
-        else:
-            if ftr == '2':
-                result = 'W'
-            elif ftr == '1':
-                result = 'L'
-            else:
-                result = 'D'
-        
-        location = 'H' if was_home else 'A'
-        return result, location
+        return timeline.results[row], timeline.locations[row]
     except Exception as e:
-        print(f"Error getting previous game result: {str(e)}")
+        app.logger.error("Error getting previous game result: %s", e)
         return None, None
 
 def get_matchday_goals(df, current_date, current_season, current_md, team):
@@ -110,9 +904,72 @@ def get_matchday_goals(df, current_date, current_season, current_md, team):
             'conceded': int(goals_conceded)
         }
     except Exception as e:
-        print(f"Error getting matchday goals for {team}: {str(e)}")
+        app.logger.error("Error getting matchday goals for %s: %s", team, e)
         return None
 
+class H2HIndex:
+    """Every played meeting of each team pair of one league, with running head-to-head totals.
+
+    A pair is keyed by its two team names in sorted order (team1, team2).
+    Meetings are stored grouped by pair and in date order, each with the
+    cumulative wins, draws and goals of both teams up to and including it,
+    and `pairs` maps a pair to its slice of rows, so a lookup is a dict
+    access instead of a scan over the league.
+    """
+    
+    TOTALS = ['team1_wins', 'draws', 'team2_wins', 'team1_goals', 'team2_goals']
+    
+    def __init__(self, df):
+        df = df[df['Date'].notna() & df['Home'].notna() & df['Away'].notna() & played_mask(df)]
+        home = df['Home'].astype(object).to_numpy()
+        away = df['Away'].astype(object).to_numpy()
+        home_first = home <= away
+        ftr = df['FTR'].to_numpy(dtype=np.int64)
+        home_goals = df['HomeG'].to_numpy(dtype=np.float64, na_value=np.nan)
+        away_goals = df['AwayG'].to_numpy(dtype=np.float64, na_value=np.nan)
+        
+        meetings = pd.DataFrame({
+            'team1': np.where(home_first, home, away),
+            'team2': np.where(home_first, away, home),
+            'date': df['Date'].to_numpy(),
+            'season': df['Season'].astype(object).to_numpy(),
+            'md': df['MD'].to_numpy(dtype=np.float64, na_value=np.nan),
+            'home_team': home,
+            'away_team': away,
+            'home_goals': home_goals,
+            'away_goals': away_goals,
+            'result': pd.Series(ftr).map(FTR_RESULTS).to_numpy(),
+            'team1_wins': np.where(home_first, ftr == 1, ftr == 2).astype(np.int64),
+            'draws': (ftr == 0).astype(np.int64),
+            'team2_wins': np.where(home_first, ftr == 2, ftr == 1).astype(np.int64),
+            # Leagues without goal columns add no goals
+            'team1_goals': np.nan_to_num(np.where(home_first, home_goals, away_goals)).astype(np.int64),
+            'team2_goals': np.nan_to_num(np.where(home_first, away_goals, home_goals)).astype(np.int64)
+        })
+        meetings = meetings.sort_values(['team1', 'team2', 'date'], kind='stable').reset_index(drop=True)
+        grouped = meetings.groupby(['team1', 'team2'], sort=False)
+        meetings[self.TOTALS] = grouped[self.TOTALS].cumsum()
+        self.meetings = meetings
+        self.pairs = {pair: (rows[0], rows[-1] + 1) for pair, rows in grouped.indices.items()}
+    
+    def __len__(self):
+        return len(self.meetings)
+    
+    @staticmethod
+    def pair_key(team1, team2):
+        """The (team1, team2) key of a pair, in either order and under any alias"""
+        return tuple(sorted((canonical_team(team1), canonical_team(team2))))
+    
+    def lookup(self, team1, team2):
+        """All meetings of a pair in date order (empty when they never met)"""
+        start, end = self.pairs.get(self.pair_key(team1, team2), (0, 0))
+        return self.meetings.iloc[start:end]
+
+@memoize_by_version(league_version)
+def get_h2h_index(league):
+    """Return the H2HIndex for a league, rebuilt when its data changes"""
+    return H2HIndex(load_league(league))
+
 def are_odds_similar(odds1, odds2, threshold=0.05):
     """Check if two sets of odds are similar (within threshold) regardless of order"""
     if len(odds1) != len(odds2):
@@ -127,504 +984,2024 @@ def get_color_code(index):
     colors = ['red', 'blue', 'green', 'purple', 'orange', 'brown', 'pink']
     return colors[index % len(colors)]
 
-def find_matching_games(matches_data):
-    """Find games with matching odds and assign colors"""
-    odds_groups = {}  # {odds_key: [game_indices]}
+# All cell offsets around a point in the 3-d odds grid
+NEIGHBOUR_CELLS = np.array(np.meshgrid([-1, 0, 1], [-1, 0, 1], [-1, 0, 1], indexing='ij')).reshape(3, -1).T
+
+def get_odds_cells(sorted_odds, threshold=0.05):
+    """Grid cell of each row of sorted odds; cells are a hair wider than the threshold,
+    so odds within the threshold of each other always fall in neighbouring cells"""
+    return np.floor(np.asarray(sorted_odds) / (threshold * (1 + 1e-9))).astype(np.int64)
+
+def odds_to_array(odds):
+    """Convert (home, draw, away) triples or {'home', 'draw', 'away'} dicts to an (n, 3) float array"""
+    rows = [(o['home'], o['draw'], o['away']) if isinstance(o, dict) else o for o in odds]
+    return np.asarray(rows, dtype=np.float64).reshape(-1, 3)
+
+def find_matching_games(odds, threshold=0.05):
+    """Find games with matching odds and assign colors.
+
+    `odds` holds one (home, draw, away) triple or odds dict per game. A game
+    joins the first group (in creation order) whose first game's odds are
+    similar per are_odds_similar, otherwise it starts a new group. Group keys
+    are bucketed on a grid so each game is compared only with the groups in
+    neighbouring cells. Returns {game_index: color} for groups of two or more.
+    """
+    sorted_odds = np.sort(odds_to_array(odds), axis=1)
+    # Games with missing odds are skipped below; keep them out of the float -> int cast
+    cells = get_odds_cells(np.nan_to_num(sorted_odds), threshold)
+    usable = ~np.isnan(sorted_odds).any(axis=1)
     
-    # Collect all odds
-    for i, match in enumerate(matches_data):
-        try:
-            # Extract odds from the last bracket in the string
-            parts = match.split(' => ')
-            if len(parts) < 2:
-                continue
-                
-            result_part = parts[1]
-            if '[' not in result_part:
-                continue
-                
-            odds_str = result_part.split('[')[-1].strip(']')
-            odds = tuple(sorted(float(x.strip()) for x in odds_str.split(',')))
-            
-            # Group by odds
-            for key, indices in odds_groups.items():
-                if are_odds_similar(odds, key):
-                    indices.append(i)
-                    break
-            else:
-                odds_groups[odds] = [i]
-            
-        except Exception as e:
-            print(f"Error processing match {i}: {str(e)}")
-            print(f"Match string: {match}")
-            continue
+    group_keys = []  # sorted odds of each group's first game
+    groups = []  # [game_indices] per group, in creation order
+    grid = {}  # {cell: [group ids]}
+    offsets = [tuple(offset) for offset in NEIGHBOUR_CELLS.tolist()]
+    for i in np.flatnonzero(usable).tolist():
+        a, b, c = odds_i = tuple(sorted_odds[i].tolist())
+        x, y, z = cell = tuple(cells[i].tolist())
+        candidates = []
+        for dx, dy, dz in offsets:
+            candidates.extend(grid.get((x + dx, y + dy, z + dz), ()))
+        for group_id in sorted(candidates):
+            ka, kb, kc = group_keys[group_id]
+            if abs(a - ka) <= threshold and abs(b - kb) <= threshold and abs(c - kc) <= threshold:
+                groups[group_id].append(i)
+                break
+        else:
+            grid.setdefault(cell, []).append(len(groups))
+            group_keys.append(odds_i)
+            groups.append([i])
+    
+    # Keep only groups with multiple matches and assign colors
+    matching = [group for group in groups if len(group) > 1]
+    return {i: get_color_code(idx) for idx, group in enumerate(matching) for i in group}
+
+# FTR codes in the league files
+FTR_RESULTS = {1: 'H', 2: 'A', 0: 'D'}
+
+class OddsIndex:
+    """Played matches of every league bucketed by their sorted odds.
+
+    Rows are sorted by grid cell (see get_odds_cells), so the candidates for
+    a query are the rows of its 27 neighbouring cells, each found with a
+    binary search; the exact are_odds_similar check is then vectorized.
+    """
+
+    # Cells are packed into one integer per row: (x * CELL_RADIX + y) * CELL_RADIX + z
+    CELL_RADIX = 1 << 20
+
+    def __init__(self, frames, threshold=0.05):
+        self.threshold = threshold
+        parts = []
+        for league, df in frames.items():
+            df = df[df['HmOd'].notna() & df['DrOd'].notna() & df['AwOd'].notna() & played_mask(df)]
+            home, draw, away = get_odds(df)
+            parts.append(pd.DataFrame({
+                'league': league,
+                'season': df['Season'].astype(str).to_numpy(),
+                'date': df['Date'].to_numpy(),
+                'home_team': df['Home'].astype(str).to_numpy(),
+                'away_team': df['Away'].astype(str).to_numpy(),
+                'result': df['FTR'].map(FTR_RESULTS).astype(str).to_numpy(),
+                'home': home,
+                'draw': draw,
+                'away': away
+            }))
+        rows = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(
+            columns=['league', 'season', 'date', 'home_team', 'away_team', 'result', 'home', 'draw', 'away'])
+        
+        sorted_odds = np.sort(rows[['home', 'draw', 'away']].to_numpy(dtype=np.float64), axis=1)
+        cell_keys = self._pack(get_odds_cells(sorted_odds, threshold))
+        order = np.argsort(cell_keys, kind='stable')
+        self.rows = rows.iloc[order].reset_index(drop=True)
+        self.sorted_odds = sorted_odds[order]
+        self.cell_keys = cell_keys[order]
+        self.leagues = self.rows['league'].to_numpy()
+        self.seasons = self.rows['season'].to_numpy()
+        self.results = self.rows['result'].to_numpy()
+        self.dates = self.rows['date'].to_numpy()
+
+    def _pack(self, cells):
+        cells = cells.astype(np.int64)
+        return (cells[:, 0] * self.CELL_RADIX + cells[:, 1]) * self.CELL_RADIX + cells[:, 2]
+
+    def __len__(self):
+        return len(self.rows)
+
+    def query(self, odds, league=None, season=None):
+        """Return row positions of matches with odds similar to `odds` (any order), most recent first"""
+        target = np.sort(np.asarray(odds, dtype=np.float64))
+        cells = get_odds_cells(target[None, :], self.threshold) + NEIGHBOUR_CELLS
+        keys = np.unique(self._pack(cells))
+        starts = np.searchsorted(self.cell_keys, keys, side='left')
+        ends = np.searchsorted(self.cell_keys, keys, side='right')
+        candidates = np.concatenate([np.arange(start, end) for start, end in zip(starts, ends)])
+        if len(candidates) == 0:
+            return candidates
+        
+        similar = np.all(np.abs(self.sorted_odds[candidates] - target) <= self.threshold, axis=1)
+        if league:
+            similar &= self.leagues[candidates] == league
+        if season:
+            similar &= self.seasons[candidates] == season
+        found = candidates[similar]
+        return found[np.argsort(self.dates[found], kind='stable')[::-1]]
+
+@memoize_by_version(get_data_version)
+def get_odds_index():
+    """Return the cross-league OddsIndex, rebuilt when any league's data changes"""
+    return OddsIndex(load_all_leagues())
+
+class Standings:
+    """League table that keeps teams sorted as results come in.
+
+    Teams are ranked by points, goal difference, goals scored, h2h points and
+    h2h away goals (all descending); remaining ties keep the order in which
+    teams were added. Setting a team's totals moves only that team's entry,
+    and a position lookup is a binary search over the sorted keys.
+    """
+
+    def __init__(self):
+        self._order = {}  # {team: order in which the team was added}
+        self._keys = {}  # {team: current sort key}
+        self._table = []  # sort keys in table order
+
+    def add_team(self, team):
+        """Add a team with empty totals at the bottom of its tie group"""
+        if team not in self._order:
+            self._order[team] = len(self._order)
+            self.set(team, 0, 0, 0, 0, 0)
+
+    def set(self, team, points, goal_diff, goals_scored, h2h_points, h2h_away_goals):
+        """Replace a team's totals and move it to its new place in the table"""
+        old_key = self._keys.get(team)
+        if old_key is not None:
+            del self._table[bisect.bisect_left(self._table, old_key)]
+        key = (-points, -goal_diff, -goals_scored, -h2h_points, -h2h_away_goals, self._order[team])
+        self._keys[team] = key
+        bisect.insort(self._table, key)
+
+    def position(self, team):
+        """Return the team's 1-based position in the current table"""
+        return bisect.bisect_left(self._table, self._keys[team]) + 1
+
+# Columns of the long (team, match) table that accumulate over a season
+TEAM_TOTALS = ['points', 'goals_scored', 'goals_conceded', 'h2h_points', 'h2h_away_goals']
+
+# A team's table state in a checkpoint: its TEAM_TOTALS after its latest match, then that match's result and location
+CHECKPOINT_FIELDS = TEAM_TOTALS + ['prev_result', 'prev_loc']
+
+def prepare_matches(df):
+    """Pick the columns used by format_match_data from a normalized league frame.
+
+    Returns one row per input row with plain numpy columns and a 'valid'
+    flag for the rows format_match_data skips (missing team names or
+    kick-off time). All parsing has already happened in normalize_league_frame.
+    """
+    ftr = df['FTR'].to_numpy(dtype=np.float64, na_value=np.nan)
+    hm_odd, dr_odd, aw_odd = get_odds(df)
+    return pd.DataFrame({
+        'season': df['Season'].astype(object),
+        'md': df['MD'].to_numpy(dtype=np.float64, na_value=np.nan),
+        'date': df['Date'],
+        'home_team': df['Home'].astype(object),
+        'away_team': df['Away'].astype(object),
+        # FTR codes 1=H, 2=A, 0=D; a missing result counts as a draw
+        'result': np.select([ftr == 1, ftr == 2], ['H', 'A'], 'D'),
+        # An unknown head-to-head reference score counts as 0-0
+        'h_home_goals': df['hHomeG'].fillna(0).to_numpy(dtype=np.int64),
+        'h_away_goals': df['hAwayG'].fillna(0).to_numpy(dtype=np.int64),
+        'hm_odd': np.nan_to_num(hm_odd),
+        'dr_odd': np.nan_to_num(dr_odd),
+        'aw_odd': np.nan_to_num(aw_odd),
+        'h_rnd': df['hRnd'].to_numpy(dtype=np.float64, na_value=np.nan),
+        'valid': (df['Home'].notna() & df['Away'].notna() & df['Date'].notna()).to_numpy()
+    }, index=df.index)
+
+def compute_team_stats(matches, initial_state=None):
+    """Add pre-match table stats for both teams to a frame of valid matches.
+
+    `matches` must be ordered the way the season is played through (season,
+    matchday, kick-off). Points and goals are the totals before the match;
+    h2h totals already include the match's own h2h reference, which is how
+    the table used for the positions has always been ranked.
+    
+    `initial_state` ({team: CHECKPOINT_FIELDS tuple}, see build_checkpoints)
+    continues a season from a checkpoint; `matches` must then hold the rest
+    of that one season.
+    """
+    n = len(matches)
+    home_wins = matches['h_home_goals'].to_numpy() > matches['h_away_goals'].to_numpy()
+    away_wins = matches['h_home_goals'].to_numpy() < matches['h_away_goals'].to_numpy()
+    result = matches['result'].to_numpy()
     
-    # Filter groups to keep only those with multiple matches
-    odds_groups = {k: v for k, v in odds_groups.items() if len(v) > 1}
+    # Long table: one row per (team, match), home row before away row
+    home_rows = pd.DataFrame({
+        'match': np.arange(n),
+        'team': matches['home_team'].to_numpy(),
+        'points': np.select([result == 'H', result == 'D'], [3, 1], 0),
+        'goals_scored': matches['h_home_goals'].to_numpy(),
+        'goals_conceded': matches['h_away_goals'].to_numpy(),
+        'h2h_points': np.select([home_wins, away_wins], [3, 0], 1),
+        'h2h_away_goals': 0,
+        'result': np.select([result == 'H', result == 'A'], ['W', 'L'], 'D'),
+        'loc': 'H'
+    })
+    away_rows = pd.DataFrame({
+        'match': np.arange(n),
+        'team': matches['away_team'].to_numpy(),
+        'points': np.select([result == 'A', result == 'D'], [3, 1], 0),
+        'goals_scored': matches['h_away_goals'].to_numpy(),
+        'goals_conceded': matches['h_home_goals'].to_numpy(),
+        'h2h_points': np.select([away_wins, home_wins], [3, 0], 1),
+        'h2h_away_goals': matches['h_away_goals'].to_numpy(),
+        'result': np.select([result == 'A', result == 'H'], ['W', 'L'], 'D'),
+        'loc': 'A'
+    })
+    long = pd.concat([home_rows, away_rows], ignore_index=True)
+    long['season'] = np.tile(matches['season'].to_numpy(), 2)
+    long = long.sort_values('match', kind='stable')
     
-    # Assign colors
-    odds_colors = {i: get_color_code(idx) for idx, group in enumerate(odds_groups.values()) for i in group}
+    # Running totals per (season, team); totals before the match exclude its own row
+    grouped = long.groupby(['season', 'team'], sort=False)
+    totals = grouped[TEAM_TOTALS].cumsum()
+    previous = grouped[['result', 'loc']].shift(1)
+    if initial_state:
+        # Start every team from its checkpointed totals and latest result
+        start = [initial_state.get(team) for team in long['team'].tolist()]
+        empty = (0,) * len(TEAM_TOTALS) + (None, None)
+        start = pd.DataFrame([state or empty for state in start], columns=CHECKPOINT_FIELDS, index=long.index)
+        totals = totals + start[TEAM_TOTALS]
+        previous = previous.fillna({'result': start['prev_result'], 'loc': start['prev_loc']})
+    before = totals - long[TEAM_TOTALS]
     
-    return odds_colors
+    stats = pd.DataFrame({
+        'points': before['points'],
+        'goals_scored': before['goals_scored'],
+        'goals_conceded': before['goals_conceded'],
+        'prev_result': previous['result'],
+        'prev_loc': previous['loc'],
+        'h2h_points': totals['h2h_points'],
+        'h2h_away_goals': totals['h2h_away_goals'],
+        'points_after': totals['points'],
+        'goals_scored_after': totals['goals_scored'],
+        'goals_conceded_after': totals['goals_conceded']
+    })
+    home_stats = stats.loc[home_rows.index].reset_index(drop=True)
+    away_stats = stats.loc[away_rows.index + n].reset_index(drop=True)
+    
+    # Add all stat columns in one go; inserting them one by one costs more than computing them
+    side_columns = {}
+    for side, side_stats in (('home', home_stats), ('away', away_stats)):
+        for column in ['points', 'goals_scored', 'goals_conceded', 'prev_result', 'prev_loc',
+                       'h2h_points', 'h2h_away_goals', 'points_after', 'goals_scored_after', 'goals_conceded_after']:
+            side_columns[f'{side}_{column}'] = side_stats[column].to_numpy()
+    matches = pd.concat([matches.reset_index(drop=True), pd.DataFrame(side_columns)], axis=1)
+    matches['home_position'], matches['away_position'] = compute_positions(matches, home_stats, away_stats,
+                                                                           initial_state)
+    return matches
 
-def format_match_data(df):
-    try:
-        print("Starting format_match_data")
-        # Convert date to datetime, handle invalid dates
-        df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
-        
-        # Sort by date
-        df = df.sort_values('Date')
+def compute_positions(matches, home_stats, away_stats, initial_state=None):
+    """Replay the season through a Standings table to get both teams' positions before each match"""
+    # Table totals when the match is ranked and after it has been played
+    def table_totals(stats, suffix):
+        goals_scored = stats[f'goals_scored{suffix}'].to_numpy()
+        goal_diff = goals_scored - stats[f'goals_conceded{suffix}'].to_numpy()
+        return list(zip(stats[f'points{suffix}'].tolist(), goal_diff.tolist(), goals_scored.tolist(),
+                        stats['h2h_points'].tolist(), stats['h2h_away_goals'].tolist()))
+    
+    home_ranked, home_after = table_totals(home_stats, ''), table_totals(home_stats, '_after')
+    away_ranked, away_after = table_totals(away_stats, ''), table_totals(away_stats, '_after')
+    
+    home_positions = []
+    away_positions = []
+    standings = None
+    current_season = None
+    for i, (season, home_team, away_team) in enumerate(zip(matches['season'].tolist(),
+                                                          matches['home_team'].tolist(),
+                                                          matches['away_team'].tolist())):
+        if standings is None or season != current_season:
+            standings = Standings()
+            if initial_state and current_season is None:
+                # Teams join in checkpoint order, which is their tie-break order
+                for team, state in initial_state.items():
+                    standings.add_team(team)
+                    standings.set(team, state[0], state[1] - state[2], state[1], state[3], state[4])
+            current_season = season
+        standings.add_team(home_team)
+        standings.add_team(away_team)
+        standings.set(home_team, *home_ranked[i])
+        standings.set(away_team, *away_ranked[i])
+        home_positions.append(standings.position(home_team))
+        away_positions.append(standings.position(away_team))
+        standings.set(home_team, *home_after[i])
+        standings.set(away_team, *away_after[i])
+    return home_positions, away_positions
+
+def build_checkpoints(played, initial_state=None):
+    """Table state of every team at the start of each matchday, from compute_team_stats output.
+
+    Returns {season: {'matchdays': {md: state}, 'final': state}} where a state
+    maps team -> CHECKPOINT_FIELDS tuple in the order the teams joined the
+    table, so a season can be recomputed from any matchday onwards.
+    """
+    sides = {}
+    for side, location in (('home', 'H'), ('away', 'A')):
+        won, lost = ('H', 'A') if side == 'home' else ('A', 'H')
+        result = np.select([played['result'].to_numpy() == won, played['result'].to_numpy() == lost],
+                           ['W', 'L'], 'D')
+        sides[side] = list(zip(played[f'{side}_points_after'].tolist(),
+                               played[f'{side}_goals_scored_after'].tolist(),
+                               played[f'{side}_goals_conceded_after'].tolist(),
+                               played[f'{side}_h2h_points'].tolist(),
+                               played[f'{side}_h2h_away_goals'].tolist(),
+                               result.tolist(),
+                               [location] * len(played)))
+    
+    checkpoints = {}
+    current_season = current_md = None
+    for season, md, home_team, away_team, home_state, away_state in zip(
+            played['season'].tolist(), played['md'].tolist(), played['home_team'].tolist(),
+            played['away_team'].tolist(), sides['home'], sides['away']):
+        if season != current_season:
+            # The initial state only applies to the first season
+            state = dict(initial_state or {}) if current_season is None else {}
+            season_checkpoints = checkpoints[season] = {'matchdays': {}, 'final': state}
+            current_season, current_md = season, None
+        if md != current_md:
+            season_checkpoints['matchdays'][int(md)] = dict(state)
+            current_md = md
+        state[home_team] = home_state
+        state[away_team] = away_state
+    return checkpoints
+
+def checkpoint_before(season_checkpoints, md):
+    """Table state before matchday md: the checkpoint of the first matchday at or after it"""
+    later = [checkpoint_md for checkpoint_md in season_checkpoints['matchdays'] if checkpoint_md >= md]
+    if later:
+        return season_checkpoints['matchdays'][min(later)]
+    return season_checkpoints['final']
+
+def build_match_dicts(matches):
+    """Turn rows of compute_team_stats output into the match objects the frontend expects"""
+    columns = {column: matches[column].tolist() for column in [
+        'home_team', 'away_team', 'result', 'hm_odd', 'dr_odd', 'aw_odd', 'h_rnd',
+        'home_points', 'away_points', 'home_position', 'away_position',
+        'home_goals_scored', 'home_goals_conceded', 'away_goals_scored', 'away_goals_conceded',
+        'home_prev_result', 'home_prev_loc', 'away_prev_result', 'away_prev_loc'
+    ]}
+    # No previous match is sent as null
+    for column in ['home_prev_result', 'home_prev_loc', 'away_prev_result', 'away_prev_loc']:
+        columns[column] = [value if isinstance(value, str) else None for value in columns[column]]
+    dates = [date.replace('T', ' ') for date in
+             np.datetime_as_string(matches['date'].to_numpy(), unit='m').tolist()]
+    return [
+        {
+            'date': dates[i],
+            'home_team': columns['home_team'][i],
+            'away_team': columns['away_team'][i],
+            'result': columns['result'][i],
+            'odds': {
+                'home': columns['hm_odd'][i],
+                'draw': columns['dr_odd'][i],
+                'away': columns['aw_odd'][i]
+            },
+            'h_rnd': columns['h_rnd'][i],
+            'home_points': columns['home_points'][i],
+            'away_points': columns['away_points'][i],
+            'home_position': columns['home_position'][i],
+            'away_position': columns['away_position'][i],
+            'home_goals_scored': columns['home_goals_scored'][i],
+            'home_goals_conceded': columns['home_goals_conceded'][i],
+            'away_goals_scored': columns['away_goals_scored'][i],
+            'away_goals_conceded': columns['away_goals_conceded'][i],
+            'home_prev_result': columns['home_prev_result'][i],
+            'home_prev_loc': columns['home_prev_loc'][i],
+            'away_prev_result': columns['away_prev_result'][i],
+            'away_prev_loc': columns['away_prev_loc'][i]
+        }
+        for i in range(len(dates))
+    ]
+
+def sort_matchdays(matchdays):
+    """Order matchday entries by season and matchday number"""
+    sorted_matchdays = {}
+    for key in sorted(matchdays.keys(), key=lambda x: (x.split('-')[0], int(x.split('-')[1]))):
+        sorted_matchdays[key] = matchdays[key]
+    return sorted_matchdays
+
+def format_seasons(df, initial_state=None):
+    """Format every season in df without touching app state.
+
+    Returns (result, matchday_answers, checkpoints); see build_checkpoints.
+    With `initial_state`, df holds one season from a checkpointed matchday
+    onwards and the table carries on from that checkpoint.
+    """
+    app.logger.debug("Starting format_match_data")
+    # Parse every column once up front (without touching the caller's frame)
+    rows = prepare_matches(df)
+    
+    # Sort by date, keeping file order for matches with the same kick-off
+    rows = rows.sort_values('date', kind='stable')
+    
+    # Get unique seasons and convert to list of strings
+    seasons = [str(season) for season in sorted(rows['season'].unique(), reverse=True) if pd.notna(season)]
+    
+    # Initialize result dictionary
+    result = {
+        'seasons': seasons,
+        'matchdays': {}
+    }
+    
+    # Play every season through in matchday order (kick-off order within a matchday)
+    rows = rows[rows['season'].isin(seasons) & (rows['md'] == rows['md'].round())]
+    rows = rows.assign(season_rank=rows['season'].map({season: i for i, season in enumerate(seasons)}))
+    rows = rows.sort_values(['season_rank', 'md'], kind='stable')
+    
+    # Pre-match stats for every valid match, computed for all seasons at once
+    played = compute_team_stats(rows[rows['valid']], initial_state)
+    played['h_rnd'] = played['h_rnd'].fillna(0).astype(np.int64)
+    match_dicts = build_match_dicts(played)
+    checkpoints = build_checkpoints(played, initial_state)
+    
+    # Per-matchday aggregates, each computed with one grouped pass
+    matchday_keys = ['season_rank', 'md']
+    h_home_goals = played['h_home_goals'].to_numpy()
+    h_away_goals = played['h_away_goals'].to_numpy()
+    counts = pd.DataFrame({
+        'season_rank': played['season_rank'].to_numpy(),
+        'md': played['md'].to_numpy(),
+        'question_H': h_home_goals > h_away_goals,
+        'question_A': h_home_goals < h_away_goals,
+        'question_D': h_home_goals == h_away_goals,
+        'out_H': played['result'].to_numpy() == 'H',
+        'out_A': played['result'].to_numpy() == 'A',
+        'out_D': played['result'].to_numpy() == 'D'
+    }).groupby(matchday_keys).sum()
+    no_counts = dict.fromkeys(counts.columns, 0)
+    counts = counts.to_dict('index')
+    
+    # Number of matches on each date of the matchday (no count for unknown dates)
+    days = rows.assign(day=rows['date'].dt.normalize())
+    day_counts = days.groupby(matchday_keys + ['day'], sort=False, dropna=False).size()
+    day_counts[day_counts.index.get_level_values('day').isna()] = 0
+    timings = {}
+    for (season_rank, md, _), count in day_counts.items():
+        timings.setdefault((season_rank, md), []).append(int(count))
+    
+    rounds_by_md = {}
+    known_rounds = rows.loc[rows['h_rnd'].notna(), matchday_keys + ['h_rnd']]
+    known_rounds = known_rounds.assign(h_rnd=known_rounds['h_rnd'].astype(np.int64)).drop_duplicates()
+    for season_rank, md, h_rnd in known_rounds.itertuples(index=False):
+        rounds_by_md.setdefault((season_rank, md), []).append(h_rnd)
+    
+    matches_by_md = {}
+    for i, key in enumerate(zip(played['season_rank'].tolist(), played['md'].tolist())):
+        matches_by_md.setdefault(key, []).append(match_dicts[i])
+    
+    matchday_answers = {}
+    for season_rank, md in rows[matchday_keys].drop_duplicates().itertuples(index=False):
+        season = seasons[season_rank]
+        matchday = int(md)
+        md_counts = counts.get((season_rank, md), no_counts)
+        h2h_results = {outcome: int(md_counts[f'question_{outcome}']) for outcome in ['H', 'A', 'D']}
+        current_results = {outcome: int(md_counts[f'out_{outcome}']) for outcome in ['H', 'A', 'D']}
         
-        # Get unique seasons and convert to list of strings
-        seasons = [str(season) for season in sorted(df['Season'].unique(), reverse=True) if pd.notna(season)]
+        # Get rounds data
+        rounds = sorted(rounds_by_md.get((season_rank, md), []))
+        rounds_str = f"Rounds[{','.join(map(str, rounds))}]"
         
-        # Initialize result dictionary
-        result = {
-            'seasons': seasons,
-            'matchdays': {}
+        # Create matchday object
+        matchday_key = f"{season}-{matchday:02d}"  # Pad matchday with leading zeros
+        result['matchdays'][matchday_key] = {
+            'season': season,
+            'matchday': matchday,
+            'matches': matches_by_md.get((season_rank, md), []),
+            'timing': timings.get((season_rank, md), []),
+            'rounds': rounds_str,
+            'question': [h2h_results['H'], h2h_results['A'], h2h_results['D']],
+            'out': [current_results['H'], current_results['A'], current_results['D']]
         }
+        app.logger.debug("Processed matchday %s: question %s, answer %s", matchday_key, h2h_results, current_results)
         
-        # Process each season
-        for season in seasons:
-            season_data = df[df['Season'] == season]
-            
-            # Get unique matchdays and convert to list of integers, handle invalid values
-            matchdays = []
-            for md in sorted(season_data['MD'].unique()):
-                try:
-                    if pd.notna(md) and str(md).strip() != '-':
-                        matchdays.append(int(float(md)))
-                except:
-                    continue
-            
-            # Initialize team stats dictionary for the season
-            team_stats = {}
-            
-            # Process each matchday
-            for matchday in matchdays:
-                matchday_data = season_data[season_data['MD'] == matchday]
-                
-                # Initialize counters for results
-                current_results = {'H': 0, 'A': 0, 'D': 0}  # home_wins, away_wins, draws
-                h2h_results = {'H': 0, 'A': 0, 'D': 0}  # home_wins, away_wins, draws
-                
-                # Format matches for this matchday
-                matches = []
-                for _, game in matchday_data.iterrows():
-                    try:
-                        # Get basic match info
-                        home_team = str(game['Home']).strip() if pd.notna(game['Home']) else "Unknown"
-                        away_team = str(game['Away']).strip() if pd.notna(game['Away']) else "Unknown"
-                        if home_team in ['-', ''] or away_team in ['-', '']:
-                            continue
-                            
-                        current_date = game['Date']
-                        if pd.isna(current_date):
-                            continue
-                        date = current_date.strftime('%Y-%m-%d %H:%M')
-                        
-                        # Initialize stats for teams if not already in dictionary
-                        if home_team not in team_stats:
-                            team_stats[home_team] = {
-                                'points': 0,
-                                'goals_scored': 0,
-                                'goals_conceded': 0,
-                                'prev_result': None,
-                                'prev_loc': None,
-                                'h2h_points': {},
-                                'h2h_away_goals': {}
-                            }
-                        if away_team not in team_stats:
-                            team_stats[away_team] = {
-                                'points': 0,
-                                'goals_scored': 0,
-                                'goals_conceded': 0,
-                                'prev_result': None,
-                                'prev_loc': None,
-                                'h2h_points': {},
-                                'h2h_away_goals': {}
-                            }
-                        
-                        # Convert FTR to proper format (1=H, 2=A, 0=D)
-                        ftr = str(game['FTR']).strip() if pd.notna(game['FTR']) else '0'
-                        if ftr in ['1', 'H']:
-                            ftr = 'H'
-                        elif ftr in ['2', 'A']:
-                            ftr = 'A'
-                        else:
-                            ftr = 'D'
-                            
-                        # Update current results
-                        current_results[ftr] += 1
-                        
-                        # Process head-to-head results
-                        try:
-                            h_score_str = str(game['hScre']).strip() if pd.notna(game['hScre']) else ''
-                            if not h_score_str or h_score_str == '-' or h_score_str == 'nan':
-                                h_home_goals = 0
-                                h_away_goals = 0
-                            else:
-                                h_score = h_score_str.split('-')
-                                if len(h_score) != 2:
-                                    h_home_goals = 0
-                                    h_away_goals = 0
-                                else:
-                                    try:
-                                        h_home_goals = int(h_score[0].strip())
-                                        h_away_goals = int(h_score[1].strip())
-                                    except ValueError:
-                                        h_home_goals = 0
-                                        h_away_goals = 0
-                            
-                            if h_home_goals > h_away_goals:
-                                h2h_results['H'] += 1
-                                if away_team not in team_stats[home_team]['h2h_points']:
-                                    team_stats[home_team]['h2h_points'][away_team] = 0
-                                if home_team not in team_stats[away_team]['h2h_points']:
-                                    team_stats[away_team]['h2h_points'][home_team] = 0
-                                team_stats[home_team]['h2h_points'][away_team] += 3
-                            elif h_home_goals < h_away_goals:
-                                h2h_results['A'] += 1
-                                if away_team not in team_stats[home_team]['h2h_points']:
-                                    team_stats[home_team]['h2h_points'][away_team] = 0
-                                if home_team not in team_stats[away_team]['h2h_points']:
-                                    team_stats[away_team]['h2h_points'][home_team] = 0
-                                team_stats[away_team]['h2h_points'][home_team] += 3
-                            else:
-                                h2h_results['D'] += 1
-                                if away_team not in team_stats[home_team]['h2h_points']:
-                                    team_stats[home_team]['h2h_points'][away_team] = 0
-                                if home_team not in team_stats[away_team]['h2h_points']:
-                                    team_stats[away_team]['h2h_points'][home_team] = 0
-                                team_stats[home_team]['h2h_points'][away_team] += 1
-                                team_stats[away_team]['h2h_points'][home_team] += 1
-                            
-                            # Update h2h away goals
-                            if away_team not in team_stats[home_team]['h2h_away_goals']:
-                                team_stats[home_team]['h2h_away_goals'][away_team] = 0
-                            if home_team not in team_stats[away_team]['h2h_away_goals']:
-                                team_stats[away_team]['h2h_away_goals'][home_team] = 0
-                            team_stats[away_team]['h2h_away_goals'][home_team] += h_away_goals
-                        except Exception as e:
-                            print(f"Error processing h2h score: {e}")
-                            print(f"hScre value that caused error: {game['hScre']}")
-                            continue
-                        
-                        # Get odds and convert to float, handle missing values
-                        hm_odd = float(game['HmOd']) if pd.notna(game['HmOd']) and str(game['HmOd']).strip() != '-' else 0.0
-                        dr_odd = float(game['DrOd']) if pd.notna(game['DrOd']) and str(game['DrOd']).strip() != '-' else 0.0
-                        aw_odd = float(game['AwOd']) if pd.notna(game['AwOd']) and str(game['AwOd']).strip() != '-' else 0.0
-                        
-                        # Get hRnd value and convert to int, handle missing values
-                        try:
-                            h_rnd_str = str(game['hRnd']).strip() if pd.notna(game['hRnd']) else ''
-                            h_rnd = int(float(h_rnd_str)) if h_rnd_str and h_rnd_str != '-' else 0
-                        except:
-                            h_rnd = 0
-                        
-                        # Calculate positions before this match
-                        teams = list(team_stats.keys())
-                        positions = {}
-                        
-                        # Sort teams by points, goal difference, goals scored, h2h points, and h2h away goals
-                        sorted_teams = sorted(teams, key=lambda x: (
-                            -team_stats[x]['points'],
-                            -(team_stats[x]['goals_scored'] - team_stats[x]['goals_conceded']),
-                            -team_stats[x]['goals_scored'],
-                            -sum(team_stats[x]['h2h_points'].values()),
-                            -sum(team_stats[x]['h2h_away_goals'].values())
-                        ))
-                        
-                        # Assign positions
-                        for i, team in enumerate(sorted_teams, 1):
-                            positions[team] = i
-                        
-                        # Create match object with additional stats
-                        match = {
-                            'date': date,
-                            'home_team': home_team,
-                            'away_team': away_team,
-                            'result': ftr,
-                            'odds': {
-                                'home': hm_odd,
-                                'draw': dr_odd,
-                                'away': aw_odd
-                            },
-                            'h_rnd': h_rnd,
-                            'home_points': team_stats[home_team]['points'],
-                            'away_points': team_stats[away_team]['points'],
-                            'home_position': positions[home_team],
-                            'away_position': positions[away_team],
-                            'home_goals_scored': team_stats[home_team]['goals_scored'],
-                            'home_goals_conceded': team_stats[home_team]['goals_conceded'],
-                            'away_goals_scored': team_stats[away_team]['goals_scored'],
-                            'away_goals_conceded': team_stats[away_team]['goals_conceded'],
-                            'home_prev_result': team_stats[home_team]['prev_result'],
-                            'home_prev_loc': team_stats[home_team]['prev_loc'],
-                            'away_prev_result': team_stats[away_team]['prev_result'],
-                            'away_prev_loc': team_stats[away_team]['prev_loc']
-                        }
-                        matches.append(match)
-                        
-                        # Update stats after the match
-                        if ftr == 'H':  # Home win
-                            team_stats[home_team]['points'] += 3
-                            team_stats[home_team]['prev_result'] = 'W'
-                            team_stats[home_team]['prev_loc'] = 'H'
-                            team_stats[away_team]['prev_result'] = 'L'
-                            team_stats[away_team]['prev_loc'] = 'A'
-                        elif ftr == 'A':  # Away win
-                            team_stats[away_team]['points'] += 3
-                            team_stats[away_team]['prev_result'] = 'W'
-                            team_stats[away_team]['prev_loc'] = 'A'
-                            team_stats[home_team]['prev_result'] = 'L'
-                            team_stats[home_team]['prev_loc'] = 'H'
-                        else:  # Draw
-                            team_stats[home_team]['points'] += 1
-                            team_stats[away_team]['points'] += 1
-                            team_stats[home_team]['prev_result'] = 'D'
-                            team_stats[home_team]['prev_loc'] = 'H'
-                            team_stats[away_team]['prev_result'] = 'D'
-                            team_stats[away_team]['prev_loc'] = 'A'
-                        
-                        # Update goals
-                        team_stats[home_team]['goals_scored'] += h_home_goals
-                        team_stats[home_team]['goals_conceded'] += h_away_goals
-                        team_stats[away_team]['goals_scored'] += h_away_goals
-                        team_stats[away_team]['goals_conceded'] += h_home_goals
-                        
-                    except Exception as e:
-                        print(f"Error processing match: {str(e)}")
-                        print(f"Match data that caused error: {game}")
-                        continue
-                
-                # Get timing data
-                timing = []
-                # Group by date only (ignoring time)
-                date_groups = matchday_data['Date'].dt.date.unique()
-                for date in date_groups:
-                    # Count matches for this date
-                    matches_on_date = len(matchday_data[matchday_data['Date'].dt.date == date])
-                    timing.append(matches_on_date)
-                
-                # Get rounds data
-                rounds = []
-                for x in matchday_data['hRnd'].unique().tolist():
-                    try:
-                        if pd.notna(x) and str(x).strip() != '-':
-                            rounds.append(int(float(x)))
-                    except:
-                        continue
-                rounds = sorted(rounds)
-                rounds_str = f"Rounds[{','.join(map(str, rounds))}]"
-                
-                # Create matchday object
-                matchday_key = f"{season}-{matchday:02d}"  # Pad matchday with leading zeros
-                result['matchdays'][matchday_key] = {
-                    'season': season,
-                    'matchday': matchday,
-                    'matches': matches,
-                    'timing': timing,
-                    'rounds': rounds_str,
-                    'question': [int(h2h_results['H']), int(h2h_results['A']), int(h2h_results['D'])],
-                    'out': [int(current_results['H']), int(current_results['A']), int(current_results['D'])]
-                }
-                print(f"Processed matchday {matchday_key}")
-                print(f"Question: {h2h_results}")
-                print(f"Answer: {current_results}")
-                
-                # Before your matchday processing loop (inside the function that processes seasons/matchdays):
-                if not hasattr(app, 'matchday_answers'):
-                    app.matchday_answers = {}
-                matchday_answers = {}
-                
-                # Inside your matchday loop, after you compute the answer:
-                matchday_key = f"{season}-{matchday:02d}"
-                matchday_answers[matchday_key] = {'answer': current_results}
-        
-        # Sort matchdays by season and matchday number
-        sorted_matchdays = {}
-        for key in sorted(result['matchdays'].keys(), key=lambda x: (x.split('-')[0], int(x.split('-')[1]))):
-            sorted_matchdays[key] = result['matchdays'][key]
-        
-        result['matchdays'] = sorted_matchdays
-        print("Successfully completed format_match_data")
+        # Only the most recently processed matchday is kept for the arranged page
+        matchday_answers = {matchday_key: {'answer': current_results}}
+    
+    # Sort matchdays by season and matchday number
+    result['matchdays'] = sort_matchdays(result['matchdays'])
+    app.logger.debug("Completed format_match_data: %d matchdays", len(result['matchdays']))
+    
+    return result, matchday_answers, checkpoints
+
+def format_match_data(df):
+    try:
+        result, matchday_answers, _ = format_seasons(df)
         
         # After processing all matchdays (outside the loop):
         app.matchday_answers = matchday_answers
         
         return result
         
-    except Exception as e:
-        print(f"Error in format_match_data: {str(e)}")
-        print(f"Error type: {type(e)}")
-        import traceback
-        print(f"Traceback: {traceback.format_exc()}")
+    except Exception:
+        app.logger.exception("Error in format_match_data")
         return None
 
+def estimate_size(obj, seen=None):
+    """Deep size in bytes of nested dicts, lists and scalars.
+
+    With `seen` (a set of ids), objects referenced more than once in the
+    structure are counted once.
+    """
+    if seen is not None:
+        if id(obj) in seen:
+            return 0
+        seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(estimate_size(key, seen) + estimate_size(value, seen) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple)):
+        size += sum(estimate_size(item, seen) for item in obj)
+    return size
+
+def estimate_result_size(result):
+    """Approximate size of a formatted result, measuring one match and scaling by the match count"""
+    size = sys.getsizeof(result) + estimate_size(result['seasons'])
+    match_size = None
+    for matchday in result['matchdays'].values():
+        matches = matchday['matches']
+        if match_size is None and matches:
+            match_size = estimate_size(matches[0])
+        size += estimate_size({key: value for key, value in matchday.items() if key != 'matches'})
+        size += sys.getsizeof(matches) + len(matches) * (match_size or 0)
+    return size
+
+class SeasonCache:
+    """Memory-bounded LRU cache of formatted seasons.
+
+    Entries are keyed by (league, season) and tagged with the data version
+    they were built from; a stale version counts as a miss. An entry's
+    size covers the formatted result and its table checkpoints (whose
+    team states are shared between matchdays, so counted once). When the
+    estimated total size goes over `max_mb`, the least recently used
+    seasons are evicted.
+    """
+
+    def __init__(self, max_mb):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # {(league, season): (version, result, answers, checkpoints, size)}
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1], entry[2], entry[3]
+            self.misses += 1
+            return None
+
+    def put(self, key, version, result, answers, checkpoints):
+        size = estimate_result_size(result) + estimate_size(checkpoints, set())
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size_bytes -= old[4]
+            if size > self.max_bytes:
+                # Larger than the whole budget: serve it but do not keep it
+                return
+            self._entries[key] = (version, result, answers, checkpoints, size)
+            self.size_bytes += size
+            while self.size_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size_bytes -= evicted[4]
+                self.evictions += 1
+
+    def retag(self, key, version, new_version):
+        """Move an entry built at `version` to `new_version` (its data did not change)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries[key] = (new_version,) + entry[1:]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size_bytes = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'size_mb': round(self.size_bytes / (1024 * 1024), 2),
+                'max_mb': round(self.max_bytes / (1024 * 1024), 2)
+            }
+
+season_cache = SeasonCache(app.config['SEASON_CACHE_MB'])
+
+_format_pool = None
+_format_pool_lock = threading.Lock()
+
+def get_format_pool():
+    """Return the shared season-formatting process pool, or None when disabled"""
+    global _format_pool
+    if app.config['FORMAT_WORKERS'] <= 1:
+        return None
+    with _format_pool_lock:
+        if _format_pool is None:
+            _format_pool = ProcessPoolExecutor(max_workers=app.config['FORMAT_WORKERS'])
+        return _format_pool
+
+def reset_format_pool():
+    global _format_pool
+    with _format_pool_lock:
+        if _format_pool is not None:
+            _format_pool.shutdown(wait=False, cancel_futures=True)
+        _format_pool = None
+
+def format_season_frames(frames):
+    """Format {season: frame} on the process pool when enabled; returns {season: format_seasons(frame)}
+
+    Small inputs are formatted serially, since sending frames and results
+    between processes costs more than it saves.
+    """
+    pool = get_format_pool()
+    total_rows = sum(len(frame) for frame in frames.values())
+    if pool is not None and len(frames) > 1 and total_rows >= app.config['PARALLEL_MIN_ROWS']:
+        try:
+            futures = {season: pool.submit(format_seasons, frame) for season, frame in frames.items()}
+            return {season: future.result() for season, future in futures.items()}
+        except BrokenProcessPool as e:
+            app.logger.warning("Format pool failed, formatting serially: %s", e)
+            reset_format_pool()
+    return {season: format_seasons(frame) for season, frame in frames.items()}
+
+def format_league(league, full_df, version, season=None):
+    """Format one season (or all seasons) of a league, reusing cached seasons.
+
+    The all-seasons result is assembled from per-season results; seasons are
+    independent because the table is reset every season, so the ones not in
+    the cache can be formatted in parallel. Returns (result, matchday_answers)
+    like format_seasons.
+    """
+    if season:
+        seasons = [season]
+    else:
+        seasons = [str(s) for s in sorted(full_df['Season'].unique(), reverse=True) if pd.notna(s)]
+    
+    formatted = {}
+    for season_name in seasons:
+        cached = season_cache.get((league, season_name), version)
+        if cached is not None:
+            formatted[season_name] = cached
+    missing = {season_name: full_df[full_df['Season'] == season_name]
+               for season_name in seasons if season_name not in formatted}
+    with timed('standings'):
+        formatted_missing = format_season_frames(missing)
+    for season_name, formatted_season in formatted_missing.items():
+        season_cache.put((league, season_name), version, *formatted_season)
+        formatted[season_name] = formatted_season
+    
+    result = {'seasons': [], 'matchdays': {}}
+    matchday_answers = {}
+    for season_name in seasons:
+        season_result, season_answers, _ = formatted[season_name]
+        result['seasons'].extend(season_result['seasons'])
+        result['matchdays'].update(season_result['matchdays'])
+        # Seasons are processed newest first, so the oldest season's last matchday wins
+        if season_answers:
+            matchday_answers = season_answers
+    
+    if len(seasons) > 1:
+        result['matchdays'] = sort_matchdays(result['matchdays'])
+    return result, matchday_answers
+
+def load_all_leagues():
+    """{league: frame} for every league whose data exists"""
+    frames = {}
+    for league in LEAGUE_FILES:
+        try:
+            frames[league] = load_league(league)
+        except FileNotFoundError:
+            continue
+    return frames
+
+def format_all_leagues():
+    """{league: (frame, all-seasons format_league result)} for every league whose data exists.
+
+    Seasons come from the season cache, so after one league changes only
+    that league is formatted again.
+    """
+    return {league: (full_df, format_league(league, full_df, league_version(league))[0])
+            for league, full_df in load_all_leagues().items()}
+
+def iter_formatted_seasons(league, full_df, version, seasons):
+    """Yield (season, formatted season) one season at a time, through the season cache"""
+    for season_name in seasons:
+        formatted = season_cache.get((league, season_name), version)
+        if formatted is None:
+            with timed('standings'):
+                formatted = format_seasons(full_df[full_df['Season'] == season_name])
+            season_cache.put((league, season_name), version, *formatted)
+        yield season_name, formatted[0]
+
+def iter_matchdays(formatted_seasons, first_md=None, last_md=None):
+    """Yield (key, matchday) for every matchday in the range, in season and matchday order"""
+    for _, season_result in formatted_seasons:
+        for key, matchday in season_result['matchdays'].items():
+            if first_md is not None and matchday['matchday'] < first_md:
+                continue
+            if last_md is not None and matchday['matchday'] > last_md:
+                continue
+            yield key, matchday
+
+def iter_ndjson(matchdays):
+    """Serialize matchdays as NDJSON lines; an error ends the stream with an error line"""
+    try:
+        for key, matchday in matchdays:
+            yield app.json.dumps(dict(matchday, key=key)) + "\n"
+    except Exception as e:
+        app.logger.exception("Error streaming matchdays: %s", e)
+        yield app.json.dumps({"error": str(e)}) + "\n"
+
+def window_matchdays(league, first_day, last_day):
+    """Matchdays of a league with a match between two 'YYYY-MM-DD' days (inclusive).
+
+    Only the seasons with matches in the range are formatted (through the
+    season cache). Returns [(first kick-off in the range, key, matchday)].
+    """
+    file_path = get_league_path(league)
+    version = league_cache.version(file_path)
+    full_df = load_league(league)
+    days = full_df['Date'].dt.strftime('%Y-%m-%d')
+    in_range = (days >= first_day) & (days <= last_day)
+    seasons = sorted(str(s) for s in full_df.loc[in_range, 'Season'].unique() if pd.notna(s))
+    found = []
+    for _, season_result in iter_formatted_seasons(league, full_df, version, seasons):
+        for key, matchday in season_result['matchdays'].items():
+            dates = [match['date'] for match in matchday['matches']
+                     if first_day <= match['date'][:10] <= last_day]
+            if dates:
+                found.append((min(dates), key, matchday))
+    return found
+
+def combine_leagues(leagues, first_day, last_day):
+    """Matchdays in a date range across leagues, loaded and formatted on a thread pool.
+
+    Returns (matchdays merged by first kick-off, {league: error} for leagues
+    that could not be loaded). Each matchday carries its league and key.
+    """
+    workers = max(1, min(app.config['COMBINED_WORKERS'], len(leagues)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='combined') as pool:
+        futures = {league: pool.submit(window_matchdays, league, first_day, last_day) for league in leagues}
+    merged, errors = [], {}
+    for order, (league, future) in enumerate(futures.items()):
+        try:
+            league_matchdays = future.result()
+        except FileNotFoundError:
+            errors[league] = "Data file not found"
+            continue
+        except Exception as e:
+            app.logger.exception("Error loading %s for combined view: %s", league, e)
+            errors[league] = str(e)
+            continue
+        for first_kickoff, key, matchday in league_matchdays:
+            merged.append((first_kickoff, order, dict(matchday, league=league, key=key)))
+    # Same kick-off: keep LEAGUE_FILES order
+    merged.sort(key=lambda item: item[:2])
+    return [matchday for _, _, matchday in merged], errors
+
+# Matchday pattern search: weight of each feature matchday_features returns, in order
+# (H/A/D shares of the h2h question, timing, then rounds)
+MATCHDAY_FEATURE_WEIGHTS = np.array([1.0, 1.0, 1.0, 0.5, 0.5, 0.25, 0.25])
+
+def parse_rounds(rounds):
+    """Round numbers of a matchday's 'Rounds[1,2,3]' string"""
+    return [int(value) for value in re.findall(r'\d+', rounds)]
+
+def matchday_features(question, timing, rounds, max_round):
+    """Unweighted feature vector of a matchday.
+
+    The h2h question as H/A/D shares, the number of match dates and the share
+    of the busiest date (both relative to the scheduled matches), and the
+    mean and spread of the h2h rounds relative to `max_round`. Shares make
+    leagues with different numbers of teams comparable.
+    """
+    question = np.asarray(question, dtype=np.float64)
+    matches = question.sum()
+    shares = question / matches if matches else question
+    timing = [count for count in timing if count]
+    scheduled = sum(timing)
+    dates = len(timing) / scheduled if scheduled else 0.0
+    busiest = max(timing) / scheduled if scheduled else 0.0
+    mean_round = np.mean(rounds) / max_round if rounds else 0.0
+    round_spread = (max(rounds) - min(rounds)) / max_round if rounds else 0.0
+    return np.array([*shares, dates, busiest, mean_round, round_spread])
+
+class MatchdayTable:
+    """Feature matrix of every played matchday of every league, searched by brute force.
+
+    There is no tree or bucketing: a query computes its weighted distance to
+    every matchday in one vectorized pass and partially sorts for the k
+    nearest. With a few thousand matchdays that stays well under a
+    millisecond. Features are pre-scaled by the square root of
+    MATCHDAY_FEATURE_WEIGHTS.
+    """
+    
+    def __init__(self, formatted):
+        """`formatted` maps league -> all-seasons result of format_league"""
+        self.leagues, self.keys, self.seasons, self.matchdays = [], [], [], []
+        questions, timings, rounds, outs = [], [], [], []
+        for league, result in formatted.items():
+            for key, matchday in result['matchdays'].items():
+                # Matchdays without a played match have nothing to compare
+                if not sum(matchday['question']) and not sum(matchday['out']):
+                    continue
+                self.leagues.append(league)
+                self.keys.append(key)
+                self.seasons.append(matchday['season'])
+                self.matchdays.append(matchday['matchday'])
+                questions.append(matchday['question'])
+                timings.append(matchday['timing'])
+                rounds.append(parse_rounds(matchday['rounds']))
+                outs.append(matchday['out'])
+        
+        self.max_round = max((max(values) for values in rounds if values), default=1)
+        self.scale = np.sqrt(MATCHDAY_FEATURE_WEIGHTS)
+        self.features = np.array([
+            self.features_for(question, timing, matchday_rounds)
+            for question, timing, matchday_rounds in zip(questions, timings, rounds)
+        ]).reshape(-1, len(MATCHDAY_FEATURE_WEIGHTS))
+        self.questions = np.array(questions, dtype=np.int64).reshape(-1, 3)
+        self.outs = np.array(outs, dtype=np.int64).reshape(-1, 3)
+        self.timings = timings
+        self.rounds = rounds
+        self.league_codes = pd.Categorical(self.leagues)
+        self.season_codes = pd.Categorical(self.seasons)
+        self.positions = {(league, key): i for i, (league, key) in enumerate(zip(self.leagues, self.keys))}
+    
+    def __len__(self):
+        return len(self.keys)
+    
+    def features_for(self, question, timing=(), rounds=()):
+        """Scaled feature vector of a matchday, comparable with the rows of the table"""
+        return matchday_features(question, timing, rounds, self.max_round) * self.scale
+    
+    def query(self, features, k=10, league=None, season=None, exclude=None):
+        """Return (positions, distances) of the k matchdays nearest to `features`, nearest first.
+
+        Ties keep index order. `exclude` is a position left out of the
+        results (the matchday a query was taken from).
+        """
+        distances = np.sqrt(np.square(self.features - features).sum(axis=1))
+        candidates = np.ones(len(distances), dtype=bool)
+        if league:
+            candidates &= np.asarray(self.league_codes == league)
+        if season:
+            candidates &= np.asarray(self.season_codes == season)
+        if exclude is not None:
+            candidates[exclude] = False
+        candidates = np.flatnonzero(candidates)
+        
+        k = min(max(k, 0), len(candidates))
+        if k == 0:
+            return candidates[:0], distances[:0]
+        if k < len(candidates):
+            candidates = candidates[np.argpartition(distances[candidates], k - 1)[:k]]
+        nearest = candidates[np.lexsort((candidates, distances[candidates]))]
+        return nearest, distances[nearest]
+
+@memoize_by_version(get_data_version)
+def get_matchday_table():
+    """Return the cross-league MatchdayTable, rebuilt when any league's data changes"""
+    return MatchdayTable({league: formatted for league, (_, formatted) in format_all_leagues().items()})
+
+@memoize_by_version(get_data_version)
+def get_backtest_table():
+    """Return the cross-league BacktestTable, rebuilt when any league's data changes"""
+    parts = []
+    for league, (full_df, formatted) in format_all_leagues().items():
+        df = full_df[played_mask(full_df) & full_df['Home'].notna() & full_df['Away'].notna()]
+        parts.append(backtesting.league_matches(league, df, get_odds(df), formatted))
+    return backtesting.BacktestTable(parts)
+
+def merge_league_rows(full_df, rows):
+    """Apply ingested rows (CSV columns) to a normalized league frame.
+
+    A row for a fixture already in the league (same Season, Home and Away)
+    replaces it where it stands; other rows are appended as new matches.
+    Returns (updated frame, {season: first affected matchday}).
+    """
+    new_df, problems = normalize_league_frame(pd.DataFrame(rows), required=['Season', 'MD', 'Home', 'Away'])
+    if problems:
+        raise LeagueDataError(f"Invalid rows: {'; '.join(problems)}")
+    if new_df[['Season', 'Home', 'Away']].isna().any().any():
+        raise LeagueDataError("Season, Home and Away are required for every row")
+    
+    def fixture_keys(df):
+        return zip(df['Season'].astype(str), df['Home'].astype(str), df['Away'].astype(str))
+    
+    # Only the seasons being ingested can hold the fixtures
+    candidates = full_df[full_df['Season'].isin(new_df['Season'].unique())]
+    positions = dict(zip(fixture_keys(candidates), candidates.index))
+    existing = [positions.get(key) for key in fixture_keys(new_df)]
+    replaced = [i for i, position in enumerate(existing) if position is not None]
+    appended = [i for i, position in enumerate(existing) if position is None]
+    
+    # Give both frames the same (sorted) categories so they concatenate without re-encoding
+    categories = {}
+    for col in full_df.columns:
+        if isinstance(full_df[col].dtype, pd.CategoricalDtype):
+            categories[col] = sorted(set(full_df[col].cat.categories) | set(new_df[col].cat.categories))
+    recode = lambda df: df.assign(**{col: df[col].cat.set_categories(values) for col, values in categories.items()})
+    combined = pd.concat([recode(full_df), recode(new_df)], ignore_index=True)
+    
+    # Row order of the result: replaced rows swapped for their new version, new rows at the end
+    n = len(full_df)
+    order = np.arange(n)
+    order[[existing[i] for i in replaced]] = n + np.array(replaced, dtype=np.int64)
+    order = np.concatenate([order, n + np.array(appended, dtype=np.int64)])
+    order = order[np.argsort(combined['Date'].to_numpy()[order], kind='stable')]
+    updated = combined.take(order).reset_index(drop=True)
+    
+    # A moved fixture also changes the matchday it was moved from
+    changed_md = pd.concat([new_df[['Season', 'MD']].astype(object),
+                            full_df[['Season', 'MD']].iloc[[existing[i] for i in replaced]].astype(object)])
+    changed_md = changed_md[changed_md['MD'].notna()]
+    first_matchdays = {str(season): int(md) for season, md in changed_md.groupby('Season')['MD'].min().items()}
+    return updated, first_matchdays
+
+_ingest_lock = threading.Lock()
+
+def ingest_matches(league, rows):
+    """Add newly completed or new matches to a league without reformatting it.
+
+    Every cached season the rows touch is recomputed from its first affected
+    matchday, starting from the table checkpointed at that matchday, and
+    stored back under the league's new data version; other cached seasons
+    are kept as they are. The updates live in this process only: other
+    gunicorn workers keep serving the data they loaded until the CSV (or the
+    league's store import) changes, and the updates are dropped then too.
+    Returns {season: first recomputed matchday}.
+    """
+    file_path = get_league_path(league)
+    if file_path is None:
+        raise KeyError(league)
+    with _ingest_lock:
+        full_df = league_cache.get(file_path)
+        version = league_cache.version(file_path)
+        updated_df, first_matchdays = merge_league_rows(full_df, rows)
+        new_version = league_cache.update(file_path, updated_df, version)
+        
+        recomputed = {}
+        updated_answers = {}
+        for season in [str(s) for s in updated_df['Season'].unique() if pd.notna(s)]:
+            key = (league, season)
+            if season not in first_matchdays:
+                season_cache.retag(key, version, new_version)
+                continue
+            cached = season_cache.get(key, version)
+            if cached is None:
+                # Not formatted yet; the next request formats it from the updated frame
+                continue
+            season_result, season_answers, season_checkpoints = cached
+            season_checkpoints = season_checkpoints.get(season, {'matchdays': {}, 'final': {}})
+            first_md = first_matchdays[season]
+            start = checkpoint_before(season_checkpoints, first_md)
+            tail_df = updated_df[(updated_df['Season'] == season) & (updated_df['MD'] >= first_md).fillna(False)]
+            tail_result, tail_answers, tail_checkpoints = format_seasons(tail_df, start)
+            
+            matchdays = {md_key: matchday for md_key, matchday in season_result['matchdays'].items()
+                         if matchday['matchday'] < first_md}
+            matchdays.update(tail_result['matchdays'])
+            tail_checkpoints = tail_checkpoints.get(season, {'matchdays': {}, 'final': start})
+            checkpoints = {
+                'matchdays': {md: state for md, state in season_checkpoints['matchdays'].items() if md < first_md},
+                'final': tail_checkpoints['final']
+            }
+            checkpoints['matchdays'].update(tail_checkpoints['matchdays'])
+            season_cache.put(key, new_version, {'seasons': season_result['seasons'],
+                                                'matchdays': sort_matchdays(matchdays)},
+                             tail_answers or season_answers, {season: checkpoints})
+            recomputed[season] = first_md
+            updated_answers.update(tail_result['matchdays'])
+        
+        # Refresh the answers shown on the arranged page if they come from this league. The dict is
+        # shared with response cache entries, so a new one is swapped in instead of editing it.
+        if app.matchday_answers_league == league:
+            app.matchday_answers = {
+                md_key: {'answer': dict(zip(['H', 'A', 'D'], updated_answers[md_key]['out']))}
+                if md_key in updated_answers else answer
+                for md_key, answer in app.matchday_answers.items()
+            }
+        return recomputed
+
+# Media type that asks /get_data for the columnar format (same as ?format=columnar)
+COLUMNAR_MIMETYPE = 'application/vnd.football-analyzer.columnar+json'
+
+# Per-match integer columns of the columnar format, in the order of the match objects
+COLUMNAR_INT_FIELDS = [
+    'h_rnd', 'home_points', 'away_points', 'home_position', 'away_position',
+    'home_goals_scored', 'home_goals_conceded', 'away_goals_scored', 'away_goals_conceded'
+]
+
+def encode_columnar(data):
+    """Re-encode formatted matchdays as a team dictionary plus column arrays per matchday.
+
+    Team names become indexes into data['teams'] and kick-off times indexes
+    into each matchday's 'dates'; results are one character per match and
+    previous results are "WH"-style strings ('' when there is none). The
+    other matchday fields are unchanged. script.js decodes it back into the
+    usual match objects (decodeMatches).
+    """
+    fields = ['date', 'home_team', 'away_team', 'result', 'odds', 'home_prev_result', 'home_prev_loc',
+              'away_prev_result', 'away_prev_loc'] + COLUMNAR_INT_FIELDS
+    get_fields = operator.itemgetter(*fields)
+    odds_of = operator.itemgetter('home', 'draw', 'away')
+    teams = {}
+    matchdays = {}
+    for key, matchday in data['matchdays'].items():
+        if not matchday['matches']:
+            columns = dict.fromkeys(['date', 'home_team', 'away_team', 'odds_home', 'odds_draw', 'odds_away',
+                                     'home_prev', 'away_prev'] + COLUMNAR_INT_FIELDS, [])
+            matchdays[key] = dict(matchday, matches=dict(columns, result=''), dates=[])
+            continue
+        # Transpose the match objects into one tuple per field
+        values = dict(zip(fields, zip(*map(get_fields, matchday['matches']))))
+        dates = {}
+        odds = list(zip(*map(odds_of, values['odds'])))
+        columns = {
+            'date': [dates.setdefault(date, len(dates)) for date in values['date']],
+            'home_team': [teams.setdefault(team, len(teams)) for team in values['home_team']],
+            'away_team': [teams.setdefault(team, len(teams)) for team in values['away_team']],
+            'result': ''.join(values['result']),
+            'odds_home': odds[0],
+            'odds_draw': odds[1],
+            'odds_away': odds[2]
+        }
+        for field in COLUMNAR_INT_FIELDS:
+            columns[field] = values[field]
+        for side in ['home', 'away']:
+            columns[f'{side}_prev'] = [(result or '') + (loc or '') for result, loc in
+                                       zip(values[f'{side}_prev_result'], values[f'{side}_prev_loc'])]
+        matchdays[key] = dict(matchday, matches=columns, dates=list(dates))
+    return {'seasons': data['seasons'], 'teams': list(teams), 'matchdays': matchdays}
+
+def build_payload(seasons, formatted_data, response_format):
+    """The /get_data response body for formatted matchdays in the given format"""
+    if response_format == 'columnar':
+        with timed('encode'):
+            return {
+                "format": "columnar",
+                "seasons": seasons,
+                "data": encode_columnar(formatted_data)
+            }
+    return {
+        "seasons": seasons,
+        "data": formatted_data
+    }
+
+def get_response_format():
+    """'columnar' when asked for by ?format=columnar or the Accept header, otherwise 'json'"""
+    requested = request.args.get('format')
+    if requested:
+        return 'columnar' if requested == 'columnar' else 'json'
+    if request.accept_mimetypes[COLUMNAR_MIMETYPE] > request.accept_mimetypes['application/json']:
+        return 'columnar'
+    return 'json'
+
+# gzip level and brotli quality: 'fast' on the request that builds a response, 'best' when
+# recompressing it in the background (and during warm-up, where no request waits)
+COMPRESSION_LEVELS = {
+    'fast': {'gzip': 6, 'br': 5},
+    'best': {'gzip': 9, 'br': 9}
+}
+
+def compress_body(body, level):
+    """{coding: compressed body} at one of the COMPRESSION_LEVELS"""
+    levels = COMPRESSION_LEVELS[level]
+    bodies = {'gzip': gzip.compress(body, compresslevel=levels['gzip'], mtime=0)}
+    if brotli is not None:
+        bodies['br'] = brotli.compress(body, quality=levels['br'])
+    return bodies
+
+def body_etags(digest, level, bodies):
+    """Strong ETags of each coding of a body; they must differ between codings and levels"""
+    suffix = '' if level == 'best' else f"-{level}"
+    etags = {'identity': digest}
+    for coding, tag in [('gzip', 'gz'), ('br', 'br')]:
+        if coding in bodies:
+            etags[coding] = f"{digest}-{tag}{suffix}"
+    return etags
+
+class ResponseCache:
+    """Serialized and pre-compressed JSON responses keyed by (league, season, format).
+
+    Each entry remembers the data version (see LeagueCache.version) it was
+    built from and is rebuilt when the data changes. Only the compressed bodies are
+    kept; the rare client without gzip support gets a decompressed copy.
+    A request that builds an entry compresses it at the 'fast' levels, and a
+    background thread swaps in a 'best' copy afterwards. Entries are never
+    modified once stored, only replaced.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}  # {(league, season, format): entry}
+        self._recompress_pool = None
+        self._recompress_pid = None
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry['version'] == version:
+                self.hits += 1
+                return entry
+            self.misses += 1
+            return None
+
+    def put(self, key, version, payload, answers, background=True):
+        """Store a response; with background=False it is compressed at the 'best' levels right away"""
+        with timed('encode'):
+            body = (app.json.dumps(payload) + "\n").encode('utf-8')
+        digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+        level = 'fast' if background else 'best'
+        with timed('compress'):
+            bodies = compress_body(body, level)
+        etags = body_etags(digest, level, bodies)
+        entry = {
+            'version': version,
+            'answers': answers,
+            'etags': etags,
+            # Every ETag issued for this body, so clients holding a 'fast' one still get a 304
+            'known_etags': tuple(etags.values()),
+            'bodies': bodies
+        }
+        with self._lock:
+            self._entries[key] = entry
+        if background:
+            self._get_recompress_pool().submit(self._recompress, key, entry, body, digest)
+        return entry
+    
+    def _get_recompress_pool(self):
+        # A pool inherited from the gunicorn master has no threads in the worker
+        with self._lock:
+            if self._recompress_pool is None or self._recompress_pid != os.getpid():
+                self._recompress_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='recompress')
+                self._recompress_pid = os.getpid()
+            return self._recompress_pool
+    
+    def _recompress(self, key, entry, body, digest):
+        """Replace an entry with a 'best' compressed copy, unless it has been replaced meanwhile"""
+        try:
+            bodies = compress_body(body, 'best')
+            etags = body_etags(digest, 'best', bodies)
+            with self._lock:
+                if self._entries.get(key) is entry:
+                    self._entries[key] = dict(entry, bodies=bodies, etags=etags,
+                                              known_etags=entry['known_etags'] + tuple(etags.values()))
+        except Exception as e:
+            app.logger.exception("Error recompressing %s: %s", key, e)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(self._entries),
+                'compressed_bytes': sum(len(body) for entry in self._entries.values()
+                                        for body in entry['bodies'].values())
+            }
+
+response_cache = ResponseCache()
+
+def send_cached_response(entry):
+    """Serve a ResponseCache entry, answering If-None-Match with 304"""
+    accepted = request.accept_encodings
+    if 'br' in entry['bodies'] and accepted['br']:
+        encoding = 'br'
+    elif accepted['gzip']:
+        encoding = 'gzip'
+    else:
+        encoding = 'identity'
+    
+    if any(request.if_none_match.contains(etag) for etag in entry['known_etags']):
+        response = Response(status=304)
+    elif encoding == 'identity':
+        response = Response(gzip.decompress(entry['bodies']['gzip']), mimetype='application/json')
+    else:
+        response = Response(entry['bodies'][encoding], mimetype='application/json')
+        response.headers['Content-Encoding'] = encoding
+    response.set_etag(entry['etags'][encoding])
+    response.headers['Vary'] = 'Accept-Encoding, Accept'
+    # Let browsers keep the body but revalidate it on every league/season switch
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+# Progress of the startup warm-up, reported by /ready
+warmup_status = {
+    'state': 'idle',  # idle -> running -> done
+    'total': 0,
+    'completed': [],
+    'failed': {},
+    'current': None,
+    'seconds': None
+}
+
+def warm_up(background=False):
+    """Load and format every league and pre-build its all-seasons responses.
+
+    Run it in the gunicorn master (wsgi.py with --preload) so forked workers
+    share the warmed caches copy-on-write instead of each paying the first
+    request. With background=True the work runs in a daemon thread and the
+    app serves requests meanwhile; start that in each worker after the fork
+    (gunicorn.conf.py), never in a process that forks later.
+    """
+    if background:
+        thread = threading.Thread(target=warm_up, name='warm-up', daemon=True)
+        thread.start()
+        return thread
+    
+    warmup_status.update(state='running', total=len(LEAGUE_FILES), completed=[], failed={}, seconds=None)
+    started = time.perf_counter()
+    for league in LEAGUE_FILES:
+        warmup_status['current'] = league
+        try:
+            file_path = get_league_path(league)
+            version = league_cache.version(file_path)
+            full_df = load_league(league)
+            formatted_data, answers = format_league(league, full_df, version)
+            seasons = sorted(full_df['Season'].dropna().unique().tolist())
+            # script.js asks for the columnar format; plain JSON is kept for other clients
+            for response_format in ['columnar', 'json']:
+                payload = build_payload(seasons, formatted_data, response_format)
+                response_cache.put((league, None, response_format), version, payload, answers, background=False)
+            warmup_status['completed'].append(league)
+        except Exception as e:
+            app.logger.exception("Error warming up %s: %s", league, e)
+            warmup_status['failed'][league] = str(e)
+    
+    # Cross-league indexes and tables are built from the leagues loaded above
+    try:
+        get_odds_index()
+    except Exception as e:
+        app.logger.exception("Error building odds index: %s", e)
+    try:
+        get_matchday_table()
+    except Exception as e:
+        app.logger.exception("Error building matchday table: %s", e)
+    try:
+        get_backtest_table()
+    except Exception as e:
+        app.logger.exception("Error building backtest table: %s", e)
+    
+    # A pool started in the gunicorn master must not be inherited by forked workers
+    reset_format_pool()
+    warmup_status.update(state='done', current=None, seconds=round(time.perf_counter() - started, 3))
+
+# Functions listed in a profile summary, by own time
+PROFILE_TOP_FUNCTIONS = 30
+# Seconds between stack samples for the folded-stack (flame graph) dump
+PROFILE_SAMPLE_INTERVAL = 0.002
+
+_profile_lock = threading.Lock()  # one profiled request per process at a time
+
+def get_profile_dir():
+    return app.config['PROFILE_DIR'] or os.path.join(app.config['DATA_DIR'], '.profiles')
+
+def profile_token_matches():
+    """True when the X-Profile header or profile query flag is set, and equals PROFILE_TOKEN if one is set"""
+    flag = request.headers.get('X-Profile') or request.args.get('profile')
+    if not flag:
+        return False
+    token = app.config['PROFILE_TOKEN']
+    return not token or hmac.compare_digest(flag, token)
+
+def profiling_requested():
+    """True when profiling is on and the request asks for it (with the right token if one is set)"""
+    return app.config['PROFILING'] and profile_token_matches()
+
+def check_profile_access():
+    """Error response for the profile routes, or None when they may be served.
+
+    Profiles include request query strings, so with PROFILE_TOKEN set they
+    are only served to requests carrying the token, like profiling itself.
+    """
+    if not app.config['PROFILING']:
+        return jsonify({"error": "Profiling is disabled"}), 404
+    if app.config['PROFILE_TOKEN'] and not profile_token_matches():
+        return jsonify({"error": "A valid profile token is required"}), 403
+    return None
+
+class StackSampler:
+    """Samples one thread's Python stack on a timer and counts the folded stacks.
+
+    The counts are the "frame;frame;frame count" lines flamegraph.pl and
+    speedscope read, which cProfile's caller/callee totals cannot provide.
+    """
+    
+    def __init__(self, thread_id, interval=PROFILE_SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+    
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+    
+    def __enter__(self):
+        self._thread.start()
+        return self
+    
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+    
+    def folded(self):
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+def top_functions(profiler, limit=PROFILE_TOP_FUNCTIONS):
+    """The functions with the most own time in a profile"""
+    stats = pstats.Stats(profiler).stats
+    rows = sorted(stats.items(), key=lambda item: item[1][2], reverse=True)[:limit]
+    return [
+        {
+            'function': f"{os.path.basename(file_name)}:{line}({name})" if line else name,
+            'calls': calls,
+            'own_s': round(own, 6),
+            'cumulative_s': round(cumulative, 6)
+        }
+        for (file_name, line, name), (_, calls, own, cumulative, _) in rows
+    ]
+
+def save_profile(profiler, sampler, status, seconds):
+    """Write a request's profile (.prof, .folded and a .json summary); returns its id.
+
+    Older profiles beyond PROFILE_KEEP are removed.
+    """
+    profile_dir = get_profile_dir()
+    os.makedirs(profile_dir, exist_ok=True)
+    now = time.time()
+    profile_id = (f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(now))}-{int(now * 1000) % 1000:03d}"
+                  f"-{os.getpid()}-{uuid.uuid4().hex[:6]}")
+    profiler.dump_stats(os.path.join(profile_dir, f"{profile_id}.prof"))
+    with open(os.path.join(profile_dir, f"{profile_id}.folded"), 'w') as f:
+        f.write(sampler.folded())
+    summary = {
+        'id': profile_id,
+        'endpoint': request.endpoint,
+        'path': request.path,
+        'query': {key: value for key, value in request.args.items() if key != 'profile'},
+        'status': status,
+        'seconds': round(seconds, 6),
+        'created': time.time(),
+        'samples': sum(sampler.stacks.values()),
+        'top_functions': top_functions(profiler)
+    }
+    # The summary is written last; listings only show profiles that have one
+    with open(os.path.join(profile_dir, f"{profile_id}.json"), 'w') as f:
+        json.dump(summary, f)
+    
+    # Ids start with the time, so name order is age order
+    summaries = sorted(glob.glob(os.path.join(profile_dir, '*.json')), reverse=True)
+    for stale in summaries[max(app.config['PROFILE_KEEP'], 1):]:
+        stem = os.path.splitext(stale)[0]
+        for suffix in ('.json', '.prof', '.folded'):
+            try:
+                os.remove(stem + suffix)
+            except OSError:
+                pass
+    return profile_id
+
+def profiled(view):
+    """Run a view under cProfile and a stack sampler when the request asks for it (see profiling_requested).
+
+    The response carries the profile id in X-Profile-Id. Only one request
+    per process is profiled at a time; others run normally meanwhile.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if not profiling_requested() or not _profile_lock.acquire(blocking=False):
+            return view(*args, **kwargs)
+        try:
+            profiler = cProfile.Profile()
+            started = time.perf_counter()
+            with StackSampler(threading.get_ident()) as sampler:
+                response = app.make_response(profiler.runcall(view, *args, **kwargs))
+            seconds = time.perf_counter() - started
+            try:
+                response.headers['X-Profile-Id'] = save_profile(profiler, sampler, response.status_code, seconds)
+            except OSError as e:
+                app.logger.error("Error saving profile: %s", e)
+            return response
+        finally:
+            _profile_lock.release()
+    return wrapper
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def log_request(response):
+    """Log the request's duration and stage timings as structured fields.
+
+    Logged at DEBUG, or at WARNING when the request took at least
+    SLOW_REQUEST_MS; the fields are also attached to the record as `fields`.
+    """
+    started = g.get('request_started')
+    if started is None:
+        return response
+    total_ms = (time.perf_counter() - started) * 1000
+    level = logging.WARNING if total_ms >= app.config['SLOW_REQUEST_MS'] else logging.DEBUG
+    if app.logger.isEnabledFor(level):
+        fields = {'method': request.method, 'path': request.path, 'status': response.status_code,
+                  'total_ms': round(total_ms, 1)}
+        fields.update({f"{stage}_ms": round(seconds * 1000, 1) for stage, seconds in g.get('timings', {}).items()})
+        app.logger.log(level, "request %s", format_fields(fields), extra={'fields': fields})
+    return response
+
 @app.route('/test')
 def test():
     return "App is running correctly!"
 
+@app.route('/ready')
+def ready():
+    # Not ready only while a warm-up is in progress; without warm-up leagues load lazily
+    status_code = 503 if warmup_status['state'] == 'running' else 200
+    return jsonify(warmup_status), status_code
+
 @app.route('/')
 def index():
     return render_template('index.html')
 
+@app.route('/cache_stats')
+def cache_stats():
+    return jsonify({
+        'leagues': league_cache.stats(),
+        'seasons': season_cache.stats(),
+        'responses': response_cache.stats()
+    })
+
 @app.route('/get_data/<league>', methods=['GET'])
+@profiled
 def get_data(league):
     try:
-        # Get the directory where the script is located
-        base_dir = os.path.dirname(os.path.abspath(__file__))
-        data_dir = os.path.join(base_dir, 'data')
-        
-        print(f"Base directory: {base_dir}")
-        print(f"Data directory: {data_dir}")
-        print(f"Current working directory: {os.getcwd()}")
-        
-        league_files = {
-            "English Premier League": "EnglishPremierLeague.csv",
-            "German Bundesliga": "GermanBundesliga.csv",
-            "Italian Serie A": "ItalySerieA.csv",
-            "Turkish Super League": "TurkishSuperLeague.csv",
-            "Portugal Primeira League": "GoodPortugal.csv",
-            "Spanish La Liga": "SpanishLaLiga.csv"
-        }
+        file_path = get_league_path(league)
+        if file_path is None:
+            return jsonify({"error": "League not found"}), 404
         
-        if league in league_files:
-            file_path = os.path.join(data_dir, league_files[league])
-            print(f"Looking for file at: {file_path}")
-            
-            if not os.path.exists(file_path):
-                print(f"File not found at {file_path}")
-                print(f"Directory contents of {data_dir}:")
-                try:
-                    print(os.listdir(data_dir))
-                except Exception as e:
-                    print(f"Error listing directory: {str(e)}")
-                return jsonify({"error": "Data file not found"}), 404
-            
-            try:
-                full_df = pd.read_csv(file_path)
-                print(f"Successfully loaded {league} data")
-                print("Sample data:")
-                print(full_df.head())
-                
-                # Check required columns
-                required_columns = ['Date', 'MD', 'Home', 'Away', 'FTR', 'hScre', 'hRnd', 'Season']
-                missing_columns = [col for col in required_columns if col not in full_df.columns]
-                if missing_columns:
-                    print(f"Missing required columns: {missing_columns}")
-                    return jsonify({"error": f"Missing required columns: {missing_columns}"}), 400
-                
-            except Exception as e:
-                print(f"Error reading CSV: {str(e)}")
-                return jsonify({"error": f"Error reading data: {str(e)}"}), 500
-            
-            # Get seasons
-            seasons = sorted(full_df['Season'].unique().tolist())
-            
-            # Get the selected season from query parameter
-            selected_season = request.args.get('season')
-            
-            if selected_season:
-                print(f"Processing season: {selected_season}")
-                df_season = full_df[full_df['Season'] == selected_season].copy()
-                formatted_data = format_match_data(df_season)
-            else:
-                # If no season is selected, format all data
-                print("No season selected, processing all data")
-                formatted_data = format_match_data(full_df)
-            
-            # Check if formatted_data is None or invalid
-            if not formatted_data or 'matchdays' not in formatted_data:
-                print("Error: formatted_data is None or invalid")
-                print(f"formatted_data: {formatted_data}")
-                return jsonify({"error": "Error processing match data"}), 500
-            
-            # Debug print the formatted data
-            print("Formatted data sample:")
-            if formatted_data and 'matchdays' in formatted_data:
-                for key, value in list(formatted_data['matchdays'].items())[:1]:
-                    print(f"Matchday {key}:")
-                    print(f"Matches: {value['matches'][:1] if value['matches'] else 'No matches'}")
-            
-            return jsonify({
-                "seasons": seasons,
-                "data": formatted_data
-            })
-            
-        elif league == 'German Bundesliga':
-            file_path = os.path.join(data_dir, 'GermanBundesliga.csv')
-            print(f"Looking for file at: {file_path}")
-            if os.path.exists(file_path):
-                try:
-                    full_df = pd.read_csv(file_path)
-                    print("Successfully loaded German Bundesliga data")
-                    print("Sample data:")
-                    print(full_df.head())
-                    
-                    # Get seasons
-                    seasons = sorted(full_df['Season'].unique().tolist())
-                    
-                    # Get the selected season from query parameter
-                    selected_season = request.args.get('season')
-                    
-                    if selected_season:
-                        print(f"Processing season: {selected_season}")
-                        df_season = full_df[full_df['Season'] == selected_season].copy()
-                        formatted_data = format_match_data(df_season)
-                    else:
-                        # If no season is selected, format all data
-                        print("No season selected, processing all data")
-                        formatted_data = format_match_data(full_df)
-                    
-                    # Debug print the formatted data
-                    print("Formatted data sample:")
-                    if formatted_data and 'matchdays' in formatted_data:
-                        for key, value in list(formatted_data['matchdays'].items())[:1]:
-                            print(f"Matchday {key}:")
-                            print(f"Matches: {value['matches'][:1] if value['matches'] else 'No matches'}")
-                    
-                    return jsonify({
-                        "seasons": seasons,
-                        "data": formatted_data
-                    })
-                except Exception as e:
-                    print(f"Error processing German Bundesliga data: {str(e)}")
-                    return jsonify({"error": f"Error processing data: {str(e)}"}), 500
-            else:
-                print(f"File not found: {file_path}")
-                return jsonify({'error': 'League not found'})
-            
-        return jsonify({"error": "League not found"}), 404
+        if not league_data_exists(file_path):
+            app.logger.warning("Data file not found at %s", file_path)
+            return jsonify({"error": "Data file not found"}), 404
+        
+        # Get the selected season from query parameter
+        selected_season = request.args.get('season')
+        
+        # Serve the pre-built response if the data has not changed since it was built
+        response_format = get_response_format()
+        cache_key = (league, selected_season or None, response_format)
+        version = league_cache.version(file_path)
+        entry = response_cache.get(cache_key, version)
+        if entry is not None:
+            app.matchday_answers = entry['answers']
+            app.matchday_answers_league = league
+            return send_cached_response(entry)
+        
+        try:
+            full_df = load_league(league)
+        except LeagueDataError as e:
+            # The file cannot be mapped to the league schema (e.g. missing required columns)
+            app.logger.warning("%s: %s", league, e)
+            return jsonify({"error": str(e)}), 400
+        except Exception as e:
+            app.logger.exception("Error reading CSV: %s", e)
+            return jsonify({"error": f"Error reading data: {str(e)}"}), 500
+        
+        # Get seasons
+        seasons = sorted(full_df['Season'].dropna().unique().tolist())
+        # Only known seasons are formatted, so the season and response caches stay bounded
+        if selected_season and selected_season not in seasons:
+            return jsonify({"error": "Season not found"}), 404
         
+        # No season selected formats all data
+        try:
+            formatted_data, app.matchday_answers = format_league(league, full_df, version, selected_season)
+            app.matchday_answers_league = league
+        except Exception as e:
+            app.logger.exception("Error in format_league: %s", e)
+            formatted_data = None
+        
+        # Check if formatted_data is None or invalid
+        if not formatted_data or 'matchdays' not in formatted_data:
+            app.logger.error("Formatted data for %s (season %s) is missing or invalid", league, selected_season)
+            return jsonify({"error": "Error processing match data"}), 500
+        
+        payload = build_payload(seasons, formatted_data, response_format)
+        
+        entry = response_cache.put(cache_key, version, payload, app.matchday_answers)
+        return send_cached_response(entry)
+        
+    except Exception as e:
+        app.logger.exception("Error in get_data: %s", e)
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/stream/<league>')
+def stream_matchdays(league):
+    """Matchdays as NDJSON, one line per matchday, formatted a season at a time.
+
+    Optional range parameters: season, and from/to matchday numbers
+    (inclusive). Only one season is held in memory at a time, so the
+    first line is sent as soon as the first season is formatted.
+    """
+    if league not in LEAGUE_FILES:
+        return jsonify({"error": "League not found"}), 404
+    try:
+        first_md = request.args.get('from', type=int)
+        last_md = request.args.get('to', type=int)
+        if ('from' in request.args and first_md is None) or ('to' in request.args and last_md is None):
+            raise ValueError
+    except ValueError:
+        return jsonify({"error": "from and to must be matchday numbers"}), 400
+    selected_season = request.args.get('season')
+    
+    try:
+        file_path = get_league_path(league)
+        version = league_cache.version(file_path)
+        full_df = load_league(league)
+    except LeagueDataError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        app.logger.exception("Error reading CSV: %s", e)
+        return jsonify({"error": f"Error reading data: {str(e)}"}), 500
+    
+    # Oldest season first, the order of the matchdays in get_data
+    seasons = sorted(str(s) for s in full_df['Season'].unique() if pd.notna(s))
+    if selected_season:
+        if selected_season not in seasons:
+            return jsonify({"error": "Season not found"}), 404
+        seasons = [selected_season]
+    
+    formatted_seasons = iter_formatted_seasons(league, full_df, version, seasons)
+    lines = iter_ndjson(iter_matchdays(formatted_seasons, first_md, last_md))
+    return Response(stream_with_context(lines), mimetype='application/x-ndjson')
+
+@app.route('/combined')
+def combined():
+    """Matchdays of every league (or the repeated league parameter) with a match in from..to.
+
+    from and to are YYYY-MM-DD days, inclusive; to defaults to a week after
+    from. Matchdays are merged across leagues by first kick-off in the range.
+    """
+    leagues = request.args.getlist('league') or list(LEAGUE_FILES)
+    unknown = [league for league in leagues if league not in LEAGUE_FILES]
+    if unknown:
+        return jsonify({"error": f"Unknown league: {', '.join(unknown)}"}), 404
+    try:
+        first_day = pd.Timestamp(request.args['from']).normalize()
+        last_day = (pd.Timestamp(request.args['to']).normalize() if request.args.get('to')
+                    else first_day + pd.Timedelta(days=6))
+    except (KeyError, ValueError):
+        return jsonify({"error": "from (and optional to) must be dates"}), 400
+    if last_day < first_day:
+        return jsonify({"error": "to must not be before from"}), 400
+    if (last_day - first_day).days >= app.config['COMBINED_MAX_DAYS']:
+        return jsonify({"error": f"The range must be shorter than {app.config['COMBINED_MAX_DAYS']} days"}), 400
+    
+    first_day, last_day = first_day.strftime('%Y-%m-%d'), last_day.strftime('%Y-%m-%d')
+    try:
+        with timed('standings'):
+            matchdays, errors = combine_leagues(list(dict.fromkeys(leagues)), first_day, last_day)
     except Exception as e:
-        print(f"Error in get_data: {str(e)}")
+        app.logger.exception("Error in combined: %s", e)
         return jsonify({"error": str(e)}), 500
+    return jsonify({'from': first_day, 'to': last_day, 'matchdays': matchdays, 'errors': errors})
+
+@app.route('/ingest/<league>', methods=['POST'])
+def ingest(league):
+    """Apply a JSON list of match rows (CSV columns) to a league in this worker only; see ingest_matches"""
+    token = app.config['INGEST_TOKEN']
+    if not token:
+        return jsonify({"error": "Ingest is disabled"}), 403
+    if not hmac.compare_digest(request.headers.get('X-Ingest-Token', ''), token):
+        return jsonify({"error": "Invalid ingest token"}), 403
+    if league not in LEAGUE_FILES:
+        return jsonify({"error": "League not found"}), 404
+    rows = request.get_json(silent=True)
+    if isinstance(rows, dict):
+        rows = rows.get('rows')
+    if not isinstance(rows, list) or not rows or not all(isinstance(row, dict) for row in rows):
+        return jsonify({"error": "Expected a non-empty JSON list of rows"}), 400
+    
+    started = time.perf_counter()
+    try:
+        recomputed = ingest_matches(league, rows)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        app.logger.exception("Error in ingest: %s", e)
+        return jsonify({"error": str(e)}), 500
+    return jsonify({
+        'league': league,
+        'rows': len(rows),
+        'recomputed_from': recomputed,
+        'seconds': round(time.perf_counter() - started, 4)
+    })
+
+@app.route('/similar_odds')
+def similar_odds():
+    """Historical matches whose odds are within 0.05 of the given home/draw/away odds"""
+    try:
+        odds = [float(request.args[name]) for name in ('home', 'draw', 'away')]
+    except (KeyError, ValueError):
+        return jsonify({"error": "home, draw and away odds are required numbers"}), 400
+    # nan/inf would reach the odds grid and come back as invalid JSON
+    if not all(np.isfinite(odd) and odd > 0 for odd in odds):
+        return jsonify({"error": "home, draw and away odds must be positive finite numbers"}), 400
+    league = request.args.get('league')
+    if league and league not in LEAGUE_FILES:
+        return jsonify({"error": "League not found"}), 404
+    season = request.args.get('season')
+    limit = request.args.get('limit', 100, type=int)
+    
+    try:
+        index = get_odds_index()
+        positions = index.query(odds, league=league, season=season)
+    except Exception as e:
+        app.logger.exception("Error in similar_odds: %s", e)
+        return jsonify({"error": str(e)}), 500
+    
+    results = index.results[positions]
+    found = index.rows.iloc[positions[:max(limit, 0)]]
+    matches = [
+        {
+            'league': row.league,
+            'season': row.season,
+            'date': row.date.strftime('%Y-%m-%d %H:%M') if pd.notna(row.date) else None,
+            'home_team': row.home_team,
+            'away_team': row.away_team,
+            'odds': {'home': row.home, 'draw': row.draw, 'away': row.away},
+            'result': row.result
+        }
+        for row in found.itertuples(index=False)
+    ]
+    return jsonify({
+        'query': {'home': odds[0], 'draw': odds[1], 'away': odds[2], 'league': league, 'season': season},
+        'count': len(positions),
+        'distribution': {outcome: int((results == outcome).sum()) for outcome in ['H', 'D', 'A']},
+        'matches': matches
+    })
+
+def parse_counts(value):
+    """Comma-separated integers of a query parameter ("5,3,2")"""
+    return [int(count) for count in value.split(',') if count.strip()]
+
+@app.route('/similar_matchdays')
+def similar_matchdays():
+    """The k historical matchdays most similar to a question/timing/rounds pattern, and their outcomes.
+
+    Query an existing matchday with league and matchday (e.g. 2024-2025-05),
+    or give the pattern as question=H,A,D with optional timing=2,5,3 and
+    rounds=20,24. search_league and season restrict the candidates.
+    """
+    league = request.args.get('league')
+    matchday_key = request.args.get('matchday')
+    search_league = request.args.get('search_league')
+    season = request.args.get('season')
+    k = request.args.get('k', 10, type=int)
+    for name in (league, search_league):
+        if name and name not in LEAGUE_FILES:
+            return jsonify({"error": "League not found"}), 404
+    
+    try:
+        table = get_matchday_table()
+    except Exception as e:
+        app.logger.exception("Error in similar_matchdays: %s", e)
+        return jsonify({"error": str(e)}), 500
+    
+    exclude = None
+    if matchday_key:
+        exclude = table.positions.get((league, matchday_key))
+        if exclude is None:
+            return jsonify({"error": "Matchday not found"}), 404
+        question = table.questions[exclude].tolist()
+        timing = table.timings[exclude]
+        rounds = table.rounds[exclude]
+    else:
+        try:
+            question = parse_counts(request.args['question'])
+            timing = parse_counts(request.args.get('timing', ''))
+            rounds = parse_counts(request.args.get('rounds', ''))
+        except (KeyError, ValueError):
+            return jsonify({"error": "question (H,A,D counts) or league and matchday are required"}), 400
+        if len(question) != 3:
+            return jsonify({"error": "question must have three counts (H,A,D)"}), 400
+    
+    positions, distances = table.query(table.features_for(question, timing, rounds), k=k,
+                                       league=search_league, season=season, exclude=exclude)
+    outs = table.outs[positions]
+    totals = outs.sum(axis=0)
+    matches = int(totals.sum())
+    return jsonify({
+        'query': {'league': league, 'matchday': matchday_key, 'question': question, 'timing': timing,
+                  'rounds': f"Rounds[{','.join(map(str, rounds))}]",
+                  'search_league': search_league, 'season': season, 'k': k},
+        'count': len(positions),
+        'distribution': {outcome: int(total) for outcome, total in zip(['H', 'A', 'D'], totals)},
+        'shares': {outcome: round(float(total) / matches, 4) if matches else None
+                   for outcome, total in zip(['H', 'A', 'D'], totals)},
+        'matchdays': [
+            {
+                'league': table.leagues[i],
+                'key': table.keys[i],
+                'season': table.seasons[i],
+                'matchday': table.matchdays[i],
+                'question': table.questions[i].tolist(),
+                'out': table.outs[i].tolist(),
+                'timing': table.timings[i],
+                'rounds': f"Rounds[{','.join(map(str, table.rounds[i]))}]",
+                'distance': round(float(distance), 6)
+            }
+            for i, distance in zip(positions.tolist(), distances.tolist())
+        ]
+    })
+
+@app.route('/head_to_head/<league>')
+def head_to_head(league):
+    """Every meeting of two teams in a league with running W/D/L and goal totals (team names in any spelling)"""
+    if league not in LEAGUE_FILES:
+        return jsonify({"error": "League not found"}), 404
+    team1 = request.args.get('team1', '').strip()
+    team2 = request.args.get('team2', '').strip()
+    if not team1 or not team2:
+        return jsonify({"error": "team1 and team2 are required"}), 400
+    
+    try:
+        index = get_h2h_index(league)
+        team1, team2 = index.pair_key(team1, team2)
+        meetings = index.lookup(team1, team2)
+    except Exception as e:
+        app.logger.exception("Error in head_to_head: %s", e)
+        return jsonify({"error": str(e)}), 500
+    
+    def goals(value):
+        return None if np.isnan(value) else int(value)
+    
+    def totals(row):
+        return {column: int(getattr(row, column)) for column in H2HIndex.TOTALS}
+    
+    rows = list(meetings.itertuples(index=False))
+    return jsonify({
+        'league': league,
+        'team1': team1,
+        'team2': team2,
+        'count': len(rows),
+        'totals': totals(rows[-1]) if rows else dict.fromkeys(H2HIndex.TOTALS, 0),
+        'meetings': [
+            {
+                'date': row.date.strftime('%Y-%m-%d %H:%M'),
+                'season': row.season,
+                'matchday': None if np.isnan(row.md) else int(row.md),
+                'home_team': row.home_team,
+                'away_team': row.away_team,
+                'home_goals': goals(row.home_goals),
+                'away_goals': goals(row.away_goals),
+                'result': row.result,
+                'totals': totals(row)
+            }
+            for row in rows
+        ]
+    })
+
+@app.route('/matches/<league>')
+def matches(league):
+    """Raw matches of a league filtered by season, md, team and from/to kick-off dates"""
+    if league not in LEAGUE_FILES:
+        return jsonify({"error": "League not found"}), 404
+    try:
+        md = request.args.get('md', type=int)
+        start = pd.Timestamp(request.args['from']) if request.args.get('from') else None
+        end = pd.Timestamp(request.args['to']) if request.args.get('to') else None
+        if 'md' in request.args and md is None:
+            raise ValueError
+    except ValueError:
+        return jsonify({"error": "md must be a number and from/to valid dates"}), 400
+    team = request.args.get('team')
+    
+    try:
+        found = query_matches(league, season=request.args.get('season'), md=md,
+                              team=canonical_team(team) if team else None, start=start, end=end)
+    except LeagueDataError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        app.logger.exception("Error in matches: %s", e)
+        return jsonify({"error": str(e)}), 500
+    
+    found = found.assign(Date=found['Date'].dt.strftime('%Y-%m-%d %H:%M'))
+    records = found.astype(object).where(found.notna(), None)
+    for column in ODDS_COLUMNS:
+        records[column] = [None if value is None else round(float(value), ODDS_DECIMALS) for value in records[column]]
+    return jsonify({'league': league, 'count': len(found), 'matches': records.to_dict('records')})
+
+@app.route('/profiles')
+def profiles():
+    """Recent request profiles, newest first (summaries without the function lists)"""
+    denied = check_profile_access()
+    if denied is not None:
+        return denied
+    limit = request.args.get('limit', 20, type=int)
+    summaries = []
+    paths = sorted(glob.glob(os.path.join(get_profile_dir(), '*.json')), reverse=True)
+    for path in paths[:max(limit, 0)]:
+        try:
+            with open(path) as f:
+                summary = json.load(f)
+        except (OSError, ValueError):
+            continue
+        summary.pop('top_functions', None)
+        summary['files'] = {kind: f"/profiles/{summary['id']}.{kind}" for kind in ('json', 'prof', 'folded')}
+        summaries.append(summary)
+    return jsonify({'profiles': summaries})
+
+@app.route('/profiles/<profile_id>.<kind>')
+def profile_file(profile_id, kind):
+    """A profile's summary (json), cProfile dump (prof) or folded stacks (folded)"""
+    denied = check_profile_access()
+    if denied is not None:
+        return denied
+    if kind not in ('json', 'prof', 'folded'):
+        return jsonify({"error": "Unknown profile file"}), 404
+    return send_from_directory(get_profile_dir(), f"{profile_id}.{kind}",
+                               mimetype='text/plain' if kind == 'folded' else None)
+
+@app.route('/backtest')
+def backtest():
+    """ROI and hit rate of a betting strategy over every league and season (see backtesting.parse_strategy)"""
+    try:
+        strategy = backtesting.parse_strategy(request.args, LEAGUE_FILES)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        table = get_backtest_table()
+        started = time.perf_counter()
+        result = backtesting.run_backtest(table, strategy)
+    except Exception as e:
+        app.logger.exception("Error in backtest: %s", e)
+        return jsonify({"error": str(e)}), 500
+    result['seconds'] = round(time.perf_counter() - started, 4)
+    return jsonify(result)
+
+@app.route('/team_form/<league>')
+def team_form(league):
+    """Every team's points, goals and last result as of a date (matches before that date)"""
+    if league not in LEAGUE_FILES:
+        return jsonify({"error": "League not found"}), 404
+    try:
+        date = pd.Timestamp(request.args['date'])
+    except (KeyError, ValueError):
+        return jsonify({"error": "A valid date parameter is required"}), 400
+    
+    try:
+        timeline = get_team_timeline(league)
+        season = request.args.get('season') or timeline.season_at(date)
+        teams = sorted(timeline.teams_by_season.get(season, []))
+        form = timeline.query(teams, [date] * len(teams), [season] * len(teams))
+    except Exception as e:
+        app.logger.exception("Error in team_form: %s", e)
+        return jsonify({"error": str(e)}), 500
+    
+    form = form.sort_values(['points', 'team'], ascending=[False, True], kind='stable')
+    return jsonify({
+        'league': league,
+        'season': season,
+        'date': date.strftime('%Y-%m-%d %H:%M'),
+        'teams': [
+            {
+                'team': row.team,
+                'played': int(row.played),
+                'points': int(row.points),
+                'goals_scored': int(row.goals_scored),
+                'goals_conceded': int(row.goals_conceded),
+                'last_result': row.last_result,
+                'last_location': row.last_location
+            }
+            for row in form.itertuples(index=False)
+        ]
+    })
+
+def count_matchday_results(df):
+    """H/A/D counts per matchday, from one crosstab of matchday against FTR.
+
+    FTR codes go through FTR_RESULTS, the mapping format_match_data uses.
+    """
+    results = df['FTR'].map(FTR_RESULTS).astype(object)
+    counts = pd.crosstab(df['MD'].astype(object), results).reindex(columns=['H', 'A', 'D'], fill_value=0)
+    return [
+        {'matchday': int(md), 'home_wins': int(home_wins), 'away_wins': int(away_wins), 'draws': int(draws)}
+        for md, home_wins, away_wins, draws in counts.sort_index().itertuples()
+    ]
+
+def store_serves(league):
+    """True when a league is read from the match store and has no ingested matches on top"""
+    signature, revision = league_cache.version(get_league_path(league))
+    return signature[0] == 'store' and revision == 0
+
+def query_matches(league, columns=None, season=None, team=None, start=None, end=None, md=None):
+    """Matches of a league by season, matchday, team (either side) or kick-off range.
+
+    Leagues served by the match store are queried through its indexes
+    without loading the league; others are filtered from the cached frame.
+    """
+    if store_serves(league):
+        return match_store.query_matches(league, columns, season=season, team=team, start=start, end=end, md=md)
+    df = load_league(league)
+    mask = pd.Series(True, index=df.index)
+    if season:
+        mask &= df['Season'] == season
+    if md is not None:
+        mask &= (df['MD'] == md).fillna(False)
+    if team:
+        mask &= (df['Home'] == team) | (df['Away'] == team)
+    if start is not None:
+        mask &= df['Date'] >= pd.Timestamp(start)
+    if end is not None:
+        mask &= df['Date'] <= pd.Timestamp(end)
+    return df.loc[mask, list(columns or LEAGUE_SCHEMA)].reset_index(drop=True)
+
+@memoize_by_version(league_version)
+def get_arranged_seasons(league):
+    """Sorted seasons of a league, rebuilt when its data changes"""
+    return sorted(query_matches(league, ['Season'])['Season'].dropna().unique().tolist())
+
+@memoize_by_version(league_version)
+def get_arranged_stats(league, season=None):
+    """Matchday result counts for a league (optionally one season), rebuilt when its data changes"""
+    return count_matchday_results(query_matches(league, ['MD', 'FTR'], season=season))
 
 @app.route('/arranged')
+@profiled
 def arranged():
-    # Read the EnglishPremierLeague.csv file
-    df = pd.read_csv('data/EnglishPremierLeague.csv')
-    # Ensure MD and FTR columns are present
-    if 'MD' not in df.columns or 'FTR' not in df.columns:
-        return 'CSV missing MD or FTR columns', 500
-    # Group by matchday and count results
-    matchday_stats = []
-    for md, group in df.groupby('MD'):
-        home_wins = (group['FTR'] == 1).sum()
-        away_wins = (group['FTR'] == 2).sum()
-        draws = (group['FTR'] == 0).sum()
-        matchday_stats.append({
-            'matchday': int(md),
-            'home_wins': int(home_wins),
-            'away_wins': int(away_wins),
-            'draws': int(draws)
-        })
-    # Sort by matchday number
-    matchday_stats = sorted(matchday_stats, key=lambda x: x['matchday'])
-    return render_template('arranged.html', matchday_stats=matchday_stats)
+    league = request.args.get('league', 'English Premier League')
+    season = request.args.get('season') or None
+    if league not in LEAGUE_FILES:
+        return 'League not found', 404
+    try:
+        seasons = get_arranged_seasons(league)
+        if season and season not in seasons:
+            return 'Season not found', 404
+        matchday_stats = get_arranged_stats(league, season)
+    except Exception as e:
+        app.logger.exception("Error in arranged: %s", e)
+        return f'Error reading data: {str(e)}', 500
+    return render_template('arranged.html', matchday_stats=matchday_stats, league=league, season=season,
+                           leagues=list(LEAGUE_FILES), seasons=seasons)
+
+@app.cli.command('import-matches')
+@click.option('--league', 'leagues', multiple=True, help='League to import (default: every league).')
+def import_matches_command(leagues):
+    """Import the league CSVs in DATA_DIR into the match store (MATCH_STORE)."""
+    for league in leagues or LEAGUE_FILES:
+        if league not in LEAGUE_FILES:
+            raise click.BadParameter(f"Unknown league {league!r}", param_hint='--league')
+        file_path = get_league_path(league)
+        if not os.path.exists(file_path):
+            click.echo(f"{league}: {file_path} not found, skipped")
+            continue
+        started = time.perf_counter()
+        # Taken before reading, so a CSV written meanwhile is seen as changed
+        csv_signature = get_file_signature(file_path)
+        df, problems = normalize_league_frame(pd.read_csv(file_path))
+        revision = match_store.import_league(league, LEAGUE_FILES[league], df, problems, csv_signature)
+        for problem in problems:
+            click.echo(f"{league}: {problem}")
+        click.echo(f"{league}: {len(df)} matches imported as revision {revision} "
+                   f"in {time.perf_counter() - started:.2f}s")
 
 if __name__ == '__main__':
     # Use the PORT environment variable provided by Render
@@ -0,0 +1,159 @@
+"""Vectorized backtests of simple betting strategies over every played match.
+
+app.py builds a BacktestTable from every league (see get_backtest_table)
+and serves run_backtest as GET /backtest. Strategies bet flat 1-unit
+stakes on the favourite, the underdog or a fixed outcome, filtered by odds
+range, table positions before the match, matchday, league and season.
+"""
+import numpy as np
+import pandas as pd
+
+# Outcomes in the column order of BacktestTable.odds
+BET_OUTCOMES = ['H', 'D', 'A']
+
+# Bets a backtest strategy can place on each match: an outcome, or the lowest/highest priced one
+BET_SELECTIONS = ['favourite', 'underdog', 'home', 'draw', 'away']
+
+# Columns of the frames league_matches returns
+MATCH_COLUMNS = ['league', 'season', 'md', 'home_team', 'away_team', 'result'] + BET_OUTCOMES + [
+    'home_position', 'away_position']
+
+def league_matches(league, df, odds, formatted):
+    """One row per played match of a league, in the layout BacktestTable is built from.
+
+    `df` holds the league's played matches with both teams known (normalized
+    columns), `odds` its (home, draw, away) odds arrays and `formatted` the
+    league's all-seasons format_league result, which supplies the table
+    positions before each match.
+    """
+    ftr = df['FTR'].to_numpy(dtype=np.int64)
+    matches = pd.DataFrame({
+        'league': league,
+        'season': df['Season'].astype(object).to_numpy(),
+        'md': df['MD'].to_numpy(dtype=np.float64, na_value=np.nan),
+        'home_team': df['Home'].astype(object).to_numpy(),
+        'away_team': df['Away'].astype(object).to_numpy(),
+        'result': np.select([ftr == 1, ftr == 0], [0, 1], 2),
+        'H': odds[0],
+        'D': odds[1],
+        'A': odds[2]
+    })
+    positions = pd.DataFrame(
+        [(matchday['season'], match['home_team'], match['away_team'],
+          match['home_position'], match['away_position'])
+         for matchday in formatted['matchdays'].values() for match in matchday['matches']],
+        columns=['season', 'home_team', 'away_team', 'home_position', 'away_position']
+    ).drop_duplicates(['season', 'home_team', 'away_team'], keep='last')
+    return matches.merge(positions, on=['season', 'home_team', 'away_team'], how='left')[MATCH_COLUMNS]
+
+class BacktestTable:
+    """Every played match of every league with its closing odds, result and pre-match positions.
+
+    Rows are aligned numpy arrays: odds is an (n, 3) matrix in BET_OUTCOMES
+    order, result the index of the actual outcome in it, and each row's
+    (league, season) is an integer group code. Positions come from the
+    formatted seasons (position before the match; NaN when unknown). A
+    strategy is then a few boolean masks and bincounts over the whole
+    history.
+    """
+    
+    def __init__(self, parts):
+        """`parts` are league_matches frames, one per league"""
+        table = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=MATCH_COLUMNS)
+        codes, groups = pd.factorize(pd.MultiIndex.from_arrays([table['league'], table['season']]), sort=True)
+        self.groups = list(groups)  # (league, season) per group code
+        self.group_codes = codes
+        self.leagues = table['league'].to_numpy(dtype=object)
+        self.seasons = table['season'].to_numpy(dtype=object)
+        self.matchdays = table['md'].to_numpy(dtype=np.float64)
+        self.result = table['result'].to_numpy(dtype=np.int64)
+        self.odds = table[BET_OUTCOMES].to_numpy(dtype=np.float64)
+        self.home_position = table['home_position'].to_numpy(dtype=np.float64)
+        self.away_position = table['away_position'].to_numpy(dtype=np.float64)
+    
+    def __len__(self):
+        return len(self.result)
+
+def parse_strategy(args, leagues):
+    """Backtest strategy from request arguments; raises ValueError for invalid values.
+
+    bet is one of BET_SELECTIONS. Optional filters: min_odds/max_odds on the
+    odds of the selected outcome, min/max_home_position and
+    min/max_away_position (table position before the match), min_matchday,
+    and league/season (repeatable, leagues from `leagues`).
+    """
+    bet = args.get('bet', 'favourite')
+    if bet not in BET_SELECTIONS:
+        raise ValueError(f"bet must be one of {', '.join(BET_SELECTIONS)}")
+    strategy = {'bet': bet, 'leagues': args.getlist('league'), 'seasons': args.getlist('season')}
+    for name in ['min_odds', 'max_odds']:
+        strategy[name] = float(args[name]) if args.get(name) else None
+    for name in ['min_home_position', 'max_home_position', 'min_away_position', 'max_away_position',
+                 'min_matchday']:
+        strategy[name] = int(args[name]) if args.get(name) else None
+    unknown = [league for league in strategy['leagues'] if league not in leagues]
+    if unknown:
+        raise ValueError(f"Unknown league: {', '.join(unknown)}")
+    return strategy
+
+def run_backtest(table, strategy):
+    """Flat 1-unit stakes on every match the strategy selects; returns totals and per-season results.
+
+    A bet returns its odds on a win and loses the stake otherwise. Matches
+    whose selected odds are missing are skipped, as are position filters on
+    matches with unknown positions.
+    """
+    n = len(table)
+    rows = np.arange(n)
+    bet = strategy['bet']
+    if bet in ('favourite', 'underdog'):
+        # Ties go to the first outcome in BET_OUTCOMES order; nan_to_num keeps missing odds from being picked
+        priced = np.nan_to_num(table.odds, nan=np.inf if bet == 'favourite' else -np.inf)
+        selection = priced.argmin(axis=1) if bet == 'favourite' else priced.argmax(axis=1)
+    else:
+        selection = np.full(n, {'home': 0, 'draw': 1, 'away': 2}[bet])
+    odds = table.odds[rows, selection]
+    
+    mask = ~np.isnan(table.odds).any(axis=1) if bet in ('favourite', 'underdog') else ~np.isnan(odds)
+    if strategy.get('min_odds') is not None:
+        mask &= odds >= strategy['min_odds']
+    if strategy.get('max_odds') is not None:
+        mask &= odds <= strategy['max_odds']
+    for side, positions in (('home', table.home_position), ('away', table.away_position)):
+        if strategy.get(f'min_{side}_position') is not None:
+            mask &= positions >= strategy[f'min_{side}_position']
+        if strategy.get(f'max_{side}_position') is not None:
+            mask &= positions <= strategy[f'max_{side}_position']
+    if strategy.get('min_matchday') is not None:
+        mask &= table.matchdays >= strategy['min_matchday']
+    if strategy.get('leagues'):
+        mask &= np.isin(table.leagues, strategy['leagues'])
+    if strategy.get('seasons'):
+        mask &= np.isin(table.seasons, strategy['seasons'])
+    
+    won = mask & (table.result == selection)
+    profit = np.where(won, odds - 1, -1.0)
+    groups = len(table.groups)
+    codes = table.group_codes[mask]
+    group_bets = np.bincount(codes, minlength=groups)
+    group_wins = np.bincount(table.group_codes[won], minlength=groups)
+    group_profit = np.bincount(codes, weights=profit[mask], minlength=groups)
+    
+    def summary(bets, wins, total_profit):
+        return {
+            'bets': int(bets),
+            'wins': int(wins),
+            'hit_rate': round(wins / bets, 4) if bets else None,
+            'profit': round(float(total_profit), 4),
+            'roi': round(float(total_profit) / bets, 4) if bets else None
+        }
+    
+    return {
+        'strategy': strategy,
+        'matches': n,
+        'total': summary(group_bets.sum(), group_wins.sum(), group_profit.sum()),
+        'seasons': [
+            dict(league=league, season=season, **summary(group_bets[code], group_wins[code], group_profit[code]))
+            for code, (league, season) in enumerate(table.groups) if group_bets[code]
+        ]
+    }
@@ -0,0 +1,134 @@
+"""Write synthetic league CSVs in the format of the files in data/.
+
+    python benchmarks/generate_league.py out.csv --teams 20 --seasons 10
+
+Every season is a double round robin. Results follow team strengths and
+the odds are priced from them. hHome/hAway/hScre/hRnd reference the pair's
+previous played meeting. Missing values use the sentinels of the real
+files: '-' for odds and h2h references, and -1 goals with FTR 0 for
+matches that have not been played yet (the latest ones).
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+COLUMNS = ['Date', 'MD', 'Home', 'Away', 'FTR', 'HomeG', 'AwayG', 'HmOd', 'DrOd', 'AwOd',
+           'Season', 'hHome', 'hAway', 'hScre', 'hRnd', 'Date_Only']
+
+# Bookmaker margin priced into the generated odds
+ODDS_MARGIN = 1.06
+
+def round_robin(teams):
+    """Fixtures of a double round robin as a list of matchdays of (home, away) team indices"""
+    slots = list(range(teams)) + ([None] if teams % 2 else [])
+    half = len(slots) // 2
+    first_half = []
+    for md in range(len(slots) - 1):
+        pairs = [(slots[i], slots[-1 - i]) for i in range(half)]
+        # Alternate home and away so no team stays at home all season
+        pairs = [(a, b) if (md + i) % 2 else (b, a) for i, (a, b) in enumerate(pairs)]
+        first_half.append([(a, b) for a, b in pairs if a is not None and b is not None])
+        slots = [slots[0], slots[-1]] + slots[1:-1]
+    return first_half + [[(b, a) for a, b in matchday] for matchday in first_half]
+
+def generate_league(teams=20, seasons=10, first_season=2015, missing_odds=0.01, missing_h2h=0.02,
+                    unplayed=0.01, seed=0):
+    """Return a synthetic league as a DataFrame with the CSV columns, newest match first.
+
+    `missing_odds` and `missing_h2h` are the shares of rows whose odds or
+    h2h reference are '-'. `unplayed` is the share of the latest matches
+    that have no result yet.
+    """
+    rng = np.random.default_rng(seed)
+    names = np.array([f"Team {i + 1:03d}" for i in range(teams)], dtype=object)
+    schedule = round_robin(teams)
+    # Spread long seasons over about 40 weeks
+    spacing = pd.Timedelta(days=min(7.0, 280 / len(schedule)))
+
+    frames = []
+    strength = rng.normal(0, 0.35, teams)
+    for s in range(seasons):
+        year = first_season + s
+        strength = 0.8 * strength + rng.normal(0, 0.15, teams)
+        home = np.concatenate([[h for h, _ in matchday] for matchday in schedule])
+        away = np.concatenate([[a for _, a in matchday] for matchday in schedule])
+        md = np.concatenate([[i + 1] * len(matchday) for i, matchday in enumerate(schedule)])
+        slot = np.concatenate([np.arange(len(matchday)) for matchday in schedule])
+        dates = (pd.Timestamp(year, 8, 10, 12) + (md - 1) * spacing
+                 + pd.to_timedelta(slot % 3, unit='D') + pd.to_timedelta(2 * (slot % 4), unit='h'))
+
+        edge = strength[home] - strength[away]
+        home_goals = rng.poisson(np.exp(0.35 + 0.6 * edge))
+        away_goals = rng.poisson(np.exp(0.1 - 0.6 * edge))
+        p_home = 0.74 / (1 + np.exp(-2.2 * (edge + 0.2)))
+        p_draw = np.full(len(edge), 0.26)
+        p_away = 1 - p_home - p_draw
+        frames.append(pd.DataFrame({
+            'Date': dates,
+            'MD': md,
+            'Home': names[home],
+            'Away': names[away],
+            'FTR': np.select([home_goals > away_goals, home_goals < away_goals], [1, 2], 0),
+            'HomeG': home_goals,
+            'AwayG': away_goals,
+            'HmOd': np.round(1 / (p_home * ODDS_MARGIN), 2),
+            'DrOd': np.round(1 / (p_draw * ODDS_MARGIN), 2),
+            'AwOd': np.round(1 / (p_away * ODDS_MARGIN), 2),
+            'Season': f"{year}-{year + 1}"
+        }))
+    df = pd.concat(frames, ignore_index=True).sort_values('Date', kind='stable').reset_index(drop=True)
+
+    # The latest matches have not been played yet
+    n = len(df)
+    pending = np.arange(n) >= n - int(round(n * unplayed))
+    df.loc[pending, ['HomeG', 'AwayG']] = -1
+    df.loc[pending, 'FTR'] = 0
+
+    # h2h reference: the pair's previous played meeting
+    pair = np.where(df['Home'] < df['Away'], df['Home'] + '|' + df['Away'], df['Away'] + '|' + df['Home'])
+    played = pd.DataFrame({
+        'hHome': df['Home'], 'hAway': df['Away'],
+        'hScre': df['HomeG'].astype(str) + '-' + df['AwayG'].astype(str), 'hRnd': df['MD']
+    })
+    played[pending] = np.nan
+    reference = played.groupby(pair).shift(1)
+    reference = reference.groupby(pair).ffill()
+    df = pd.concat([df, reference], axis=1)
+    df['hRnd'] = df['hRnd'].astype('Int64')
+    df.loc[rng.random(n) < missing_h2h, ['hHome', 'hAway', 'hScre', 'hRnd']] = np.nan
+    for column in ['hHome', 'hAway', 'hScre', 'hRnd']:
+        df[column] = df[column].astype(object).where(df[column].notna(), '-')
+
+    odds = ['HmOd', 'DrOd', 'AwOd']
+    df[odds] = df[odds].astype(object)
+    df.loc[rng.random(n) < missing_odds, odds] = '-'
+
+    df['Date_Only'] = df['Date'].dt.strftime('%Y-%m-%d')
+    df['Date'] = df['Date'].dt.strftime('%Y-%m-%d %H:%M:%S')
+    return df[COLUMNS].iloc[::-1].reset_index(drop=True)
+
+def write_league(path, **options):
+    """Generate a league (see generate_league) and write it as CSV; returns the number of rows"""
+    df = generate_league(**options)
+    df.to_csv(path, index=False)
+    return len(df)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('path', help='CSV file to write')
+    parser.add_argument('--teams', type=int, default=20)
+    parser.add_argument('--seasons', type=int, default=10)
+    parser.add_argument('--first-season', type=int, default=2015)
+    parser.add_argument('--missing-odds', type=float, default=0.01, help="share of rows with '-' odds")
+    parser.add_argument('--missing-h2h', type=float, default=0.02, help="share of rows with a '-' h2h reference")
+    parser.add_argument('--unplayed', type=float, default=0.01, help='share of the latest matches with -1 goals')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    rows = write_league(args.path, teams=args.teams, seasons=args.seasons, first_season=args.first_season,
+                        missing_odds=args.missing_odds, missing_h2h=args.missing_h2h,
+                        unplayed=args.unplayed, seed=args.seed)
+    print(f"Wrote {rows} matches to {args.path}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,233 @@
+"""Load-test the app under gunicorn and report throughput and latency percentiles per route.
+
+    python benchmarks/load_test.py                                  # 2 workers x 4 threads, 16 clients, 30s
+    python benchmarks/load_test.py --workers 4 --threads 8 --clients 64 --duration 60 --output load.json
+    python benchmarks/load_test.py --url http://127.0.0.1:8000 --clients 32   # an already running server
+
+The app is started the way the Procfile runs it (gunicorn --preload
+wsgi:app, so leagues are warmed in the master). The harness waits until it
+answers, then lets each client replay a weighted mix of what the frontend
+sends: loading a league, switching seasons (both in the columnar format
+script.js asks for), the arranged page and the index page.
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import quote, urlsplit
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app import LEAGUE_FILES  # noqa: E402
+
+# Route -> share of the traffic
+TRAFFIC_MIX = {
+    'league': 0.35,  # /get_data/<league>, every season
+    'season': 0.45,  # /get_data/<league>?season=<season>
+    'arranged': 0.15,  # /arranged?league=<league>&season=<season>
+    'index': 0.05  # /
+}
+
+HEADERS = {'Accept-Encoding': 'gzip, br', 'Connection': 'keep-alive'}
+
+def start_server(port, workers, threads, timeout, warm_up):
+    """Start gunicorn on localhost; returns the process once the app answers"""
+    env = dict(os.environ, WARM_UP='1' if warm_up else '0')
+    command = ['gunicorn', '--preload', '--workers', str(workers), '--threads', str(threads),
+               '--bind', f"127.0.0.1:{port}", '--log-level', 'warning', 'wsgi:app']
+    process = subprocess.Popen(command, cwd=ROOT, env=env, start_new_session=True)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with code {process.returncode}")
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            conn.request('GET', '/test')
+            if conn.getresponse().status == 200:
+                conn.close()
+                return process
+        except OSError:
+            pass
+        time.sleep(0.5)
+    stop_server(process)
+    raise RuntimeError(f"gunicorn did not answer within {timeout}s")
+
+def stop_server(process):
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait(timeout=30)
+    except (ProcessLookupError, subprocess.TimeoutExpired):
+        os.killpg(process.pid, signal.SIGKILL)
+
+def get_json(host, port, path):
+    conn = http.client.HTTPConnection(host, port, timeout=120)
+    try:
+        conn.request('GET', path)
+        response = conn.getresponse()
+        return response.status, json.loads(response.read() or b'null')
+    finally:
+        conn.close()
+
+def discover_seasons(host, port):
+    """{league: [seasons]} for the leagues the server can load"""
+    seasons = {}
+    for league in LEAGUE_FILES:
+        status, body = get_json(host, port, f"/get_data/{quote(league)}?format=columnar")
+        if status == 200 and body.get('seasons'):
+            seasons[league] = body['seasons']
+    return seasons
+
+def make_request(route, rng, seasons):
+    """Path for one request of a route, picking a league and season like a user would"""
+    league = rng.choice(sorted(seasons))
+    season = rng.choice(seasons[league])
+    if route == 'league':
+        return f"/get_data/{quote(league)}?format=columnar"
+    if route == 'season':
+        return f"/get_data/{quote(league)}?season={quote(season)}&format=columnar"
+    if route == 'arranged':
+        return f"/arranged?league={quote(league)}&season={quote(season)}"
+    return '/'
+
+class Client(threading.Thread):
+    """One keep-alive connection sending requests back to back until the deadline"""
+
+    def __init__(self, host, port, seasons, mix, deadline, seed):
+        super().__init__(daemon=True)
+        self.host, self.port = host, port
+        self.seasons = seasons
+        self.routes, self.weights = zip(*mix.items())
+        self.deadline = deadline
+        self.rng = random.Random(seed)
+        self.samples = []  # (route, seconds, status, bytes); status None for connection errors
+
+    def run(self):
+        conn = None
+        while time.monotonic() < self.deadline:
+            route = self.rng.choices(self.routes, self.weights)[0]
+            path = make_request(route, self.rng, self.seasons)
+            started = time.perf_counter()
+            try:
+                if conn is None:
+                    conn = http.client.HTTPConnection(self.host, self.port, timeout=120)
+                conn.request('GET', path, headers=HEADERS)
+                response = conn.getresponse()
+                body = response.read()
+                self.samples.append((route, time.perf_counter() - started, response.status, len(body)))
+                if response.getheader('Connection', '').lower() == 'close':
+                    conn.close()
+                    conn = None
+            except (OSError, http.client.HTTPException):
+                self.samples.append((route, time.perf_counter() - started, None, 0))
+                if conn is not None:
+                    conn.close()
+                conn = None
+        if conn is not None:
+            conn.close()
+
+def summarize(samples, seconds):
+    """Throughput and latency percentiles (ms) per route and overall"""
+    by_route = {}
+    for route, latency, status, size in samples:
+        by_route.setdefault(route, []).append((latency, status, size))
+    by_route['all'] = [(latency, status, size) for _, latency, status, size in samples]
+    report = {}
+    for route, route_samples in by_route.items():
+        latencies = np.array([latency for latency, _, _ in route_samples]) * 1000
+        errors = sum(1 for _, status, _ in route_samples if status is None or status >= 400)
+        report[route] = {
+            'requests': len(route_samples),
+            'errors': errors,
+            'throughput_rps': round(len(route_samples) / seconds, 2),
+            'mean_ms': round(float(latencies.mean()), 2),
+            'p50_ms': round(float(np.percentile(latencies, 50)), 2),
+            'p95_ms': round(float(np.percentile(latencies, 95)), 2),
+            'p99_ms': round(float(np.percentile(latencies, 99)), 2),
+            'max_ms': round(float(latencies.max()), 2),
+            'mean_kb': round(sum(size for _, _, size in route_samples) / len(route_samples) / 1024, 1)
+        }
+    return report
+
+def parse_mix(value):
+    """'league=0.4,season=0.4,arranged=0.2' -> {route: weight}"""
+    mix = {}
+    for part in value.split(','):
+        route, _, weight = part.partition('=')
+        if route not in TRAFFIC_MIX:
+            raise argparse.ArgumentTypeError(f"unknown route {route!r}; routes: {', '.join(TRAFFIC_MIX)}")
+        mix[route] = float(weight)
+    return mix
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn worker processes')
+    parser.add_argument('--threads', type=int, default=4, help='threads per gunicorn worker')
+    parser.add_argument('--clients', type=int, default=16, help='concurrent clients')
+    parser.add_argument('--duration', type=float, default=30, help='seconds of load')
+    parser.add_argument('--mix', type=parse_mix, default=TRAFFIC_MIX,
+                        help=f"route weights, default {','.join(f'{k}={v}' for k, v in TRAFFIC_MIX.items())}")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--url', help='load-test a running server instead of starting gunicorn')
+    parser.add_argument('--no-warm-up', action='store_true', help='start gunicorn with WARM_UP=0')
+    parser.add_argument('--startup-timeout', type=float, default=300)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write the report as JSON to this file')
+    args = parser.parse_args()
+
+    process = None
+    if args.url:
+        target = urlsplit(args.url)
+        host, port = target.hostname, target.port or 80
+    else:
+        host, port = '127.0.0.1', args.port
+        print(f"Starting gunicorn: {args.workers} workers x {args.threads} threads", flush=True)
+        started = time.perf_counter()
+        process = start_server(port, args.workers, args.threads, args.startup_timeout, not args.no_warm_up)
+        print(f"Server up after {time.perf_counter() - started:.1f}s", flush=True)
+    try:
+        seasons = discover_seasons(host, port)
+        if not seasons:
+            raise RuntimeError("the server has no league data")
+        print(f"Replaying {args.duration:.0f}s of traffic from {args.clients} clients "
+              f"over {len(seasons)} leagues", flush=True)
+        started = time.monotonic()
+        clients = [Client(host, port, seasons, args.mix, started + args.duration, args.seed + i)
+                   for i in range(args.clients)]
+        for client in clients:
+            client.start()
+        for client in clients:
+            client.join()
+        elapsed = time.monotonic() - started
+    finally:
+        if process is not None:
+            stop_server(process)
+
+    report = summarize([sample for client in clients for sample in client.samples], elapsed)
+    print(f"\n{'route':<10} {'requests':>9} {'errors':>7} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} "
+          f"{'p99 ms':>9} {'max ms':>9}")
+    for route, row in report.items():
+        print(f"{route:<10} {row['requests']:>9} {row['errors']:>7} {row['throughput_rps']:>8} {row['p50_ms']:>9} "
+              f"{row['p95_ms']:>9} {row['p99_ms']:>9} {row['max_ms']:>9}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'config': {'workers': args.workers, 'threads': args.threads, 'clients': args.clients,
+                           'duration_s': args.duration, 'mix': args.mix, 'url': args.url,
+                           'warm_up': not args.no_warm_up},
+                'elapsed_s': round(elapsed, 3),
+                'routes': report
+            }, f, indent=2)
+        print(f"\nReport written to {args.output}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,218 @@
+"""Time format_match_data, find_matching_games and the get_data route at several data sizes.
+
+    python benchmarks/run_benchmarks.py                       # 1x, 10x and 100x
+    python benchmarks/run_benchmarks.py --scales 1 10 --repeat 5 --output run.json
+    python benchmarks/run_benchmarks.py --scales 1 --compare benchmarks/results/base.json --fail-above 1.3
+
+For every scale a synthetic league (see generate_league.py) is written to a
+temporary DATA_DIR as the English Premier League file; the other leagues
+are absent. Routes are timed through Flask's test client. The stage
+timings get_data logs (load, normalize, standings, encode, compress) are
+recorded with each request. Results are written as JSON to
+benchmarks/results/ unless --output is given.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import app as football  # noqa: E402
+from generate_league import write_league  # noqa: E402
+
+LEAGUE = "English Premier League"
+
+# Scale -> (teams, seasons); 1x is about the size of today's league files (~3.8k matches)
+SCALES = {
+    1: (20, 10),
+    10: (40, 24),
+    100: (100, 38)
+}
+
+class FieldRecorder(logging.Handler):
+    """Keeps the structured fields of the request log lines (see log_request in app.py)"""
+
+    def __init__(self):
+        super().__init__()
+        self.fields = []
+
+    def emit(self, record):
+        if hasattr(record, 'fields'):
+            self.fields.append(record.fields)
+
+def reset_caches(data_dir, column_cache=True):
+    """Drop every in-process cache, and the column cache on disk unless column_cache=False"""
+    football.league_cache.clear()
+    football.season_cache.clear()
+    football.response_cache.clear()
+    if column_cache:
+        shutil.rmtree(os.path.join(data_dir, '.cache'), ignore_errors=True)
+
+def measure(run, repeat, setup=None):
+    """Run `run` `repeat` times (after `setup` each time); returns (seconds per run, last result)"""
+    seconds = []
+    result = None
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        result = run()
+        seconds.append(time.perf_counter() - started)
+    return seconds, result
+
+def request(client, recorder, url):
+    """GET a URL through the test client; returns the logged stage fields"""
+    before = len(recorder.fields)
+    response = client.get(url, headers={'Accept-Encoding': 'gzip'})
+    if response.status_code != 200:
+        raise RuntimeError(f"{url} returned {response.status_code}")
+    return recorder.fields[before] if len(recorder.fields) > before else {}
+
+def benchmark_scale(scale, repeat, client, recorder):
+    """Time every stage for one scale; returns a list of result records"""
+    teams, seasons = SCALES[scale]
+    data_dir = tempfile.mkdtemp(prefix=f"bench-{scale}x-")
+    football.app.config['DATA_DIR'] = data_dir
+    football.app.config['MATCH_STORE'] = os.path.join(data_dir, 'matches.sqlite3')
+    football.app.config['COLUMN_CACHE_DIR'] = None
+    try:
+        csv_path = os.path.join(data_dir, football.LEAGUE_FILES[LEAGUE])
+        started = time.perf_counter()
+        rows = write_league(csv_path, teams=teams, seasons=seasons, seed=scale)
+        print(f"{scale}x: {rows} matches ({teams} teams, {seasons} seasons), "
+              f"generated in {time.perf_counter() - started:.1f}s", flush=True)
+
+        league_url = f"/get_data/{LEAGUE}"
+        full_df = football.load_league(LEAGUE)
+        latest_season = max(str(season) for season in full_df['Season'].dropna().unique())
+        odds = np.column_stack(football.get_odds(full_df))
+        similar_odds_url = f"/similar_odds?home={odds[0, 0]}&draw={odds[0, 1]}&away={odds[0, 2]}"
+        # stage -> (URL requested through the test client, or function called directly; setup before each run)
+        stages = {
+            # Nothing cached: CSV parse and normalization, formatting, encoding and compression
+            'get_data_cold': (league_url, lambda: reset_caches(data_dir)),
+            # Column cache on disk, nothing in memory
+            'get_data_column_cache': (league_url, lambda: reset_caches(data_dir, column_cache=False)),
+            # Formatted seasons cached, the response is encoded again
+            'get_data_encode': (league_url, football.response_cache.clear),
+            'get_data_cached': (league_url, None),
+            'get_data_season': (f"{league_url}?season={latest_season}", football.response_cache.clear),
+            'format_match_data': (lambda: football.format_match_data(football.load_league(LEAGUE)), None),
+            'find_matching_games': (lambda: football.find_matching_games(odds), None),
+            'similar_odds': (similar_odds_url, None)
+        }
+
+        results = []
+        for stage, (target, setup) in stages.items():
+            if isinstance(target, str):
+                seconds, fields = measure(lambda: request(client, recorder, target), repeat, setup)
+            else:
+                seconds, fields = measure(target, repeat, setup)[0], None
+            record = {
+                'scale': scale,
+                'teams': teams,
+                'seasons': seasons,
+                'rows': rows,
+                'stage': stage,
+                'median_s': round(statistics.median(seconds), 6),
+                'min_s': round(min(seconds), 6),
+                'runs_s': [round(value, 6) for value in seconds]
+            }
+            if fields:
+                record['fields'] = {key: value for key, value in fields.items() if key.endswith('_ms')}
+            results.append(record)
+            print(f"  {stage:<24} median {record['median_s'] * 1000:10.1f} ms"
+                  f"{'  ' + str(record['fields']) if 'fields' in record else ''}", flush=True)
+        return results
+    finally:
+        reset_caches(data_dir)
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+def get_metadata():
+    """Where and on what a run was taken"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'format_workers': football.app.config['FORMAT_WORKERS']
+    }
+
+def compare(results, baseline_path, fail_above):
+    """Print the median ratio to a previous run per (scale, stage); returns the regressed stages"""
+    with open(baseline_path) as f:
+        baseline = {(record['scale'], record['stage']): record for record in json.load(f)['results']}
+    regressions = []
+    print(f"\nCompared with {baseline_path}:")
+    for record in results:
+        previous = baseline.get((record['scale'], record['stage']))
+        if previous is None or not previous['median_s']:
+            continue
+        ratio = record['median_s'] / previous['median_s']
+        flag = ''
+        if fail_above and ratio > fail_above:
+            regressions.append(f"{record['scale']}x {record['stage']}")
+            flag = '  REGRESSION'
+        print(f"  {record['scale']:>3}x {record['stage']:<24} {previous['median_s'] * 1000:10.1f} ms -> "
+              f"{record['median_s'] * 1000:10.1f} ms  x{ratio:.2f}{flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scales', type=int, nargs='+', default=sorted(SCALES), choices=sorted(SCALES))
+    parser.add_argument('--repeat', type=int, default=3, help='runs per stage (the median is reported)')
+    parser.add_argument('--output', help='JSON file for the results (default: benchmarks/results/<time>.json)')
+    parser.add_argument('--compare', help='results JSON of an earlier run to compare with')
+    parser.add_argument('--fail-above', type=float,
+                        help='with --compare, exit 1 when a stage is more than this many times slower')
+    args = parser.parse_args()
+
+    # Every request logs its stage timings; keep them off stderr
+    football.app.config['SLOW_REQUEST_MS'] = 0
+    football.app.logger.setLevel(logging.WARNING)
+    football.app.logger.handlers.clear()
+    football.app.logger.propagate = False
+    recorder = FieldRecorder()
+    football.app.logger.addHandler(recorder)
+    client = football.app.test_client()
+
+    results = []
+    for scale in args.scales:
+        results.extend(benchmark_scale(scale, args.repeat, client, recorder))
+
+    output = args.output or os.path.join(ROOT, 'benchmarks', 'results',
+                                         f"{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({'meta': get_metadata(), 'results': results}, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.fail_above)
+        if regressions:
+            print(f"Slower than x{args.fail_above}: {', '.join(regressions)}")
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
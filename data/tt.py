@@ -1,4 +1,13 @@
-import pandas as pd
+import os
+import sys
 
-data = pd.read_csv("GoodItaly.csv")
+# Read through the app so the data comes from the match store when it has been imported
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app import LEAGUE_FILES, load_league
+
+league = sys.argv[1] if len(sys.argv) > 1 else "Italian Serie A"
+if league not in LEAGUE_FILES:
+    sys.exit(f"Unknown league {league!r}; choose one of: {', '.join(LEAGUE_FILES)}")
+
+data = load_league(league)
 print(data.head(10))
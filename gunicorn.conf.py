@@ -0,0 +1,9 @@
+import os
+
+# Read by gunicorn from the working directory (see the Procfile)
+
+def post_fork(server, worker):
+    # WARM_UP_BACKGROUND=1: each worker warms its own caches in a thread (see wsgi.py)
+    if os.environ.get('WARM_UP', '1') != '0' and os.environ.get('WARM_UP_BACKGROUND') == '1':
+        from app import warm_up
+        warm_up(background=True)
@@ -4,6 +4,9 @@ let currentDateIndex = 0;
 let currentMatchdayData = null;
 let dateGroups = [];
 
+// Ask /get_data for the columnar format: a team-name dictionary plus column arrays per matchday
+const DATA_FORMAT = 'columnar';
+
 document.getElementById('simplifiedView').addEventListener('change', function() {
     simplifiedView = this.checked;
     
@@ -85,7 +88,7 @@ function selectLeague(league) {
         selectedButton.classList.add('active');
     }
     
-    fetch(`/get_data/${encodeURIComponent(league)}`)
+    fetch(`/get_data/${encodeURIComponent(league)}?format=${DATA_FORMAT}`)
         .then(response => {
             console.log('Response status:', response.status);
             return response.json();
@@ -155,7 +158,7 @@ function displaySeasonData(season) {
         document.getElementById('dataDisplay').innerHTML = '<p class="error">Request timed out. Please try again.</p>';
     }, 30000);
     
-    fetch(`/get_data/${encodeURIComponent(league)}?season=${encodeURIComponent(season)}`)
+    fetch(`/get_data/${encodeURIComponent(league)}?season=${encodeURIComponent(season)}&format=${DATA_FORMAT}`)
         .then(response => {
             console.log('Response received:', response.status);
             clearTimeout(timeoutId);
@@ -224,6 +227,51 @@ function displaySeasonData(season) {
         });
 }
 
+// Turn a columnar matchday back into the match objects of the default format
+function decodeMatches(matchday, teams) {
+    const columns = matchday.matches;
+    const splitPrev = value => value ? [value[0], value[1]] : [null, null];
+    return columns.home_team.map((homeTeam, i) => {
+        const [homePrevResult, homePrevLoc] = splitPrev(columns.home_prev[i]);
+        const [awayPrevResult, awayPrevLoc] = splitPrev(columns.away_prev[i]);
+        return {
+            date: matchday.dates[columns.date[i]],
+            home_team: teams[homeTeam],
+            away_team: teams[columns.away_team[i]],
+            result: columns.result[i],
+            odds: {
+                home: columns.odds_home[i],
+                draw: columns.odds_draw[i],
+                away: columns.odds_away[i]
+            },
+            h_rnd: columns.h_rnd[i],
+            home_points: columns.home_points[i],
+            away_points: columns.away_points[i],
+            home_position: columns.home_position[i],
+            away_position: columns.away_position[i],
+            home_goals_scored: columns.home_goals_scored[i],
+            home_goals_conceded: columns.home_goals_conceded[i],
+            away_goals_scored: columns.away_goals_scored[i],
+            away_goals_conceded: columns.away_goals_conceded[i],
+            home_prev_result: homePrevResult,
+            home_prev_loc: homePrevLoc,
+            away_prev_result: awayPrevResult,
+            away_prev_loc: awayPrevLoc
+        };
+    });
+}
+
+// Match objects of a matchday in either format; columnar matchdays are decoded once, when first shown
+function getMatches(matchday, teams = globalData && globalData.teams) {
+    if (Array.isArray(matchday.matches)) {
+        return matchday.matches;
+    }
+    if (!matchday.decodedMatches) {
+        matchday.decodedMatches = decodeMatches(matchday, teams);
+    }
+    return matchday.decodedMatches;
+}
+
 function formatMatch(match, isComparison) {
     // If match is a string (legacy), parse as before
     if (typeof match === 'string') {
@@ -291,16 +339,18 @@ function createMatchdayHTML(matchday, data, isComparison = false) {
     let html = `<div class="matchday ${isComparison ? 'comparison-matchday' : ''}">`;
     html += `<h3>${matchday}</h3>`;
     
+    const matches = getMatches(data);
+    
     // If in comparison and simplified view, only show results
     if (isComparison && simplifiedView) {
-        data.matches.forEach(match => {
+        matches.forEach(match => {
             html += `<div class="match">${formatMatch(match, true)}</div>`;
         });
         html += '</div>';
         return html;
     }
     // Otherwise, show all details
-    data.matches.forEach(match => {
+    matches.forEach(match => {
         html += `<div class="match">${formatMatch(match, isComparison)}</div>`;
     });
     
@@ -372,7 +422,7 @@ function displayData(data) {
         const tbody = document.createElement('tbody');
         
         // Process each match
-        matchday.matches.forEach(match => {
+        getMatches(matchday, data.teams).forEach(match => {
             const row = document.createElement('tr');
             
             // Format previous results
@@ -527,7 +577,7 @@ function groupMatchesByDate() {
         console.log('No currentMatchdayData in groupMatchesByDate');
         return;
     }
-    const matches = currentMatchdayData.matches;
+    const matches = getMatches(currentMatchdayData);
     console.log('groupMatchesByDate: matches:', matches);
     // Try to use timing if available, otherwise group by date
     const timing = currentMatchdayData.summary && currentMatchdayData.summary.timing;
@@ -725,7 +775,7 @@ function displayMatchday(matchdayData) {
     const tbody = document.createElement('tbody');
     
     // Add each match as a row
-    matchdayData.matches.forEach(match => {
+    getMatches(matchdayData).forEach(match => {
         const row = document.createElement('tr');
         
         // Format odds
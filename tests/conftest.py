@@ -0,0 +1,28 @@
+import glob
+import os
+import shutil
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import app as football  # noqa: E402
+
+def reset_caches():
+    football.league_cache.clear()
+    football.season_cache.clear()
+    football.response_cache.clear()
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """A copy of the bundled league CSVs as DATA_DIR, with empty caches and no match store"""
+    for path in glob.glob(os.path.join(ROOT, 'data', '*.csv')):
+        shutil.copy2(path, tmp_path)
+    monkeypatch.setitem(football.app.config, 'DATA_DIR', str(tmp_path))
+    monkeypatch.setitem(football.app.config, 'MATCH_STORE', str(tmp_path / 'matches.sqlite3'))
+    monkeypatch.setitem(football.app.config, 'COLUMN_CACHE_DIR', None)
+    reset_caches()
+    yield tmp_path
+    reset_caches()
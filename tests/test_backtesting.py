@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+from werkzeug.datastructures import MultiDict
+
+import backtesting
+
+nan = np.nan
+
+def make_table():
+    # result is the index of the actual outcome in BET_OUTCOMES (H, D, A)
+    rows = [
+        ('L', '2023-2024', 1, 'A', 'B', 0, 1.5, 4.0, 6.0, 1, 2),
+        ('L', '2023-2024', 1, 'C', 'D', 0, 2.5, 3.2, 2.0, 5, 6),
+        ('L', '2023-2024', 2, 'B', 'C', 1, 1.8, 3.5, 4.0, 10, 3),
+        ('L', '2023-2024', 2, 'D', 'A', 1, nan, 3.3, 2.9, nan, nan),
+        ('M', '2024-2025', 1, 'E', 'F', 2, 3.0, 3.0, 2.2, 3, 4),
+        ('M', '2024-2025', 3, 'F', 'E', 2, 2.0, 3.0, 2.0, 8, 1),
+    ]
+    return backtesting.BacktestTable([pd.DataFrame(rows, columns=backtesting.MATCH_COLUMNS)])
+
+def strategy(**values):
+    return dict({'bet': 'favourite', 'leagues': [], 'seasons': []}, **values)
+
+def test_favourite_profit_and_roi():
+    result = backtesting.run_backtest(make_table(), strategy())
+    assert result['matches'] == 6
+    # Row 4 has no home odds; row 6's tied favourite goes to the home side
+    assert result['total'] == {'bets': 5, 'wins': 2, 'hit_rate': 0.4,
+                               'profit': pytest.approx(-1.3), 'roi': pytest.approx(-0.26)}
+    assert result['seasons'] == [
+        {'league': 'L', 'season': '2023-2024', 'bets': 3, 'wins': 1, 'hit_rate': 0.3333,
+         'profit': pytest.approx(-1.5), 'roi': pytest.approx(-0.5)},
+        {'league': 'M', 'season': '2024-2025', 'bets': 2, 'wins': 1, 'hit_rate': 0.5,
+         'profit': pytest.approx(0.2), 'roi': pytest.approx(0.1)},
+    ]
+
+def test_fixed_outcome_only_needs_its_own_odds():
+    total = backtesting.run_backtest(make_table(), strategy(bet='draw'))['total']
+    # Draws at 3.5 and 3.3 win, the other four stakes are lost
+    assert total == {'bets': 6, 'wins': 2, 'hit_rate': 0.3333,
+                     'profit': pytest.approx(0.8), 'roi': pytest.approx(0.1333)}
+
+def test_underdog_loses_every_stake():
+    total = backtesting.run_backtest(make_table(), strategy(bet='underdog'))['total']
+    assert total == {'bets': 5, 'wins': 0, 'hit_rate': 0.0, 'profit': -5.0, 'roi': -1.0}
+
+@pytest.mark.parametrize('filters, bets, profit', [
+    ({'min_odds': 2.0}, 3, -0.8),
+    ({'max_odds': 1.9}, 2, -0.5),
+    ({'max_home_position': 5}, 3, 0.7),
+    ({'min_away_position': 3}, 3, -0.8),
+    ({'min_matchday': 2}, 2, -2.0),
+    ({'leagues': ['M']}, 2, 0.2),
+    ({'seasons': ['2023-2024']}, 3, -1.5),
+])
+def test_filters(filters, bets, profit):
+    total = backtesting.run_backtest(make_table(), strategy(**filters))['total']
+    assert total['bets'] == bets
+    assert total['profit'] == pytest.approx(profit)
+
+def test_no_bets_has_no_rates():
+    result = backtesting.run_backtest(make_table(), strategy(min_odds=100.0))
+    assert result['total'] == {'bets': 0, 'wins': 0, 'hit_rate': None, 'profit': 0.0, 'roi': None}
+    assert result['seasons'] == []
+
+def test_parse_strategy():
+    args = MultiDict([('bet', 'away'), ('min_odds', '1.5'), ('max_home_position', '4'),
+                      ('league', 'L'), ('league', 'M'), ('season', '2023-2024')])
+    assert backtesting.parse_strategy(args, ['L', 'M']) == strategy(
+        bet='away', leagues=['L', 'M'], seasons=['2023-2024'], min_odds=1.5, max_odds=None,
+        min_home_position=None, max_home_position=4, min_away_position=None, max_away_position=None,
+        min_matchday=None)
+    with pytest.raises(ValueError):
+        backtesting.parse_strategy(MultiDict({'bet': 'both'}), ['L'])
+    with pytest.raises(ValueError):
+        backtesting.parse_strategy(MultiDict({'league': 'X'}), ['L'])
+    with pytest.raises(ValueError):
+        backtesting.parse_strategy(MultiDict({'min_odds': 'high'}), ['L'])
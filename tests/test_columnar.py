@@ -0,0 +1,57 @@
+import pytest
+
+import app as football
+
+def decode_matches(matchday, teams):
+    """Python port of decodeMatches in static/js/script.js"""
+    columns = matchday['matches']
+    def split_prev(value):
+        return (value[0], value[1]) if value else (None, None)
+    matches = []
+    for i, home_team in enumerate(columns['home_team']):
+        home_prev_result, home_prev_loc = split_prev(columns['home_prev'][i])
+        away_prev_result, away_prev_loc = split_prev(columns['away_prev'][i])
+        match = {
+            'date': matchday['dates'][columns['date'][i]],
+            'home_team': teams[home_team],
+            'away_team': teams[columns['away_team'][i]],
+            'result': columns['result'][i],
+            'odds': {
+                'home': columns['odds_home'][i],
+                'draw': columns['odds_draw'][i],
+                'away': columns['odds_away'][i]
+            },
+            'home_prev_result': home_prev_result,
+            'home_prev_loc': home_prev_loc,
+            'away_prev_result': away_prev_result,
+            'away_prev_loc': away_prev_loc
+        }
+        for field in football.COLUMNAR_INT_FIELDS:
+            match[field] = columns[field][i]
+        matches.append(match)
+    return matches
+
+def decode(data):
+    matchdays = {}
+    for key, matchday in data['matchdays'].items():
+        matchday = dict(matchday, matches=decode_matches(matchday, data['teams']))
+        del matchday['dates']
+        matchdays[key] = matchday
+    return {'seasons': data['seasons'], 'matchdays': matchdays}
+
+@pytest.mark.parametrize('league', list(football.LEAGUE_FILES))
+def test_columnar_decodes_to_the_default_format(data_dir, league):
+    client = football.app.test_client()
+    seasons = client.get(f"/get_data/{league}").get_json()['seasons']
+    for season in [None] + seasons:
+        query = {'season': season} if season else {}
+        default = client.get(f"/get_data/{league}", query_string=query).get_json()
+        columnar = client.get(f"/get_data/{league}", query_string=dict(query, format='columnar')).get_json()
+        assert columnar['format'] == 'columnar'
+        assert columnar['seasons'] == default['seasons']
+        assert decode(columnar['data']) == default['data']
+
+def test_accept_header_selects_columnar(data_dir):
+    response = football.app.test_client().get("/get_data/English Premier League",
+                                              headers={'Accept': football.COLUMNAR_MIMETYPE})
+    assert response.get_json()['format'] == 'columnar'
@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import app as football
+from conftest import reset_caches
+
+H2H_COLUMNS = ['hHome', 'hAway', 'hHomeG', 'hAwayG', 'hRnd']
+
+@pytest.mark.parametrize('league', list(football.LEAGUE_FILES))
+def test_loading_keeps_h2h_references_from_the_file(data_dir, league):
+    expected, _ = football.normalize_league_frame(pd.read_csv(football.get_league_path(league)))
+    # Parsed from the CSV, then read back from the column cache
+    for _ in range(2):
+        reset_caches()
+        loaded = football.load_league(league)
+        pd.testing.assert_frame_equal(loaded[H2H_COLUMNS].reset_index(drop=True), expected[H2H_COLUMNS],
+                                      check_categorical=False)
+
+def naive_meetings(df, team1, team2):
+    """Played meetings of a pair by a plain row scan, in date order"""
+    pair = ((df['Home'] == team1) & (df['Away'] == team2)) | ((df['Home'] == team2) & (df['Away'] == team1))
+    return df[pair & football.played_mask(df) & df['Date'].notna()].sort_values('Date', kind='stable')
+
+def test_h2h_totals_match_a_row_scan(data_dir):
+    league = "English Premier League"
+    df = football.load_league(league)
+    index = football.get_h2h_index(league)
+    team1, team2 = index.pair_key('Manchester City', 'Liverpool')
+    expected = naive_meetings(df, team1, team2)
+    
+    response = football.app.test_client().get(f"/head_to_head/{league}",
+                                              query_string={'team1': team2, 'team2': team1})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['count'] == len(expected) > 0
+    team1_home = expected['Home'] == team1
+    ftr = expected['FTR']
+    assert body['totals'] == {
+        'team1_wins': int((team1_home & (ftr == 1)).sum() + (~team1_home & (ftr == 2)).sum()),
+        'draws': int((ftr == 0).sum()),
+        'team2_wins': int((team1_home & (ftr == 2)).sum() + (~team1_home & (ftr == 1)).sum()),
+        'team1_goals': int(np.where(team1_home, expected['HomeG'], expected['AwayG']).sum()),
+        'team2_goals': int(np.where(team1_home, expected['AwayG'], expected['HomeG']).sum())
+    }
@@ -0,0 +1,71 @@
+import json
+
+import pandas as pd
+import pytest
+
+import app as football
+from conftest import reset_caches
+
+LEAGUE = "English Premier League"
+
+def csv_rows(df):
+    """Rows of a raw CSV frame as the JSON /ingest receives"""
+    return json.loads(df.to_json(orient='records'))
+
+def format_all(league):
+    df = football.load_league(league)
+    return football.format_league(league, df, football.league_cache.version(football.get_league_path(league)))[0]
+
+def ingest_and_compare(rows):
+    """Ingest rows into formatted (cached) seasons; returns (recomputed, incremental result, full result)"""
+    format_all(LEAGUE)
+    recomputed = football.ingest_matches(LEAGUE, rows)
+    incremental = format_all(LEAGUE)
+    football.season_cache.clear()
+    return recomputed, incremental, format_all(LEAGUE)
+
+@pytest.fixture
+def raw(data_dir):
+    return pd.read_csv(football.get_league_path(LEAGUE))
+
+def test_changed_results_match_full_recompute(raw):
+    rows = raw[(raw['Season'] == '2024-2025') & (raw['MD'] == 30)].copy()
+    rows['HomeG'], rows['AwayG'] = rows['AwayG'].to_numpy(), rows['HomeG'].to_numpy()
+    rows['FTR'] = rows['FTR'].map({1: 2, 2: 1, 0: 0})
+    
+    recomputed, incremental, full = ingest_and_compare(csv_rows(rows))
+    assert recomputed == {'2024-2025': 30}
+    assert incremental == full
+    
+    reset_caches()
+    assert format_all(LEAGUE) != full  # the ingest lives in memory only, the CSV is unchanged
+
+def test_new_and_moved_fixtures_match_full_recompute(raw):
+    season = raw['Season'].max()
+    last_md = raw.loc[raw['Season'] == season, 'MD'].max()
+    moved = raw[(raw['Season'] == season) & (raw['MD'] == last_md)].head(1).copy()
+    moved['MD'] = last_md + 1
+    moved['Date'] = '2030-01-01 12:00:00'
+    new = moved.copy()
+    new['Home'], new['Away'] = moved['Away'].to_numpy(), moved['Home'].to_numpy()
+    new['Date'] = '2030-01-02 12:00:00'
+    
+    recomputed, incremental, full = ingest_and_compare(csv_rows(pd.concat([moved, new])))
+    assert recomputed == {season: last_md}
+    assert incremental == full
+    added = full['matchdays'][f"{season}-{last_md + 1:02d}"]['matches']
+    assert [match['home_team'] for match in added] == [moved['Home'].iat[0], new['Home'].iat[0]]
+
+def test_arranged_answers_are_replaced_not_mutated(raw):
+    season = raw['Season'].max()
+    last_md = int(raw.loc[raw['Season'] == season, 'MD'].max())
+    key = f"{season}-{last_md:02d}"
+    shared = {key: {'answer': {'H': 0, 'A': 0, 'D': 0}}}
+    football.app.matchday_answers = shared
+    football.app.matchday_answers_league = LEAGUE
+    
+    rows = raw[(raw['Season'] == season) & (raw['MD'] == last_md)]
+    ingest_and_compare(csv_rows(rows))
+    assert shared == {key: {'answer': {'H': 0, 'A': 0, 'D': 0}}}
+    assert football.app.matchday_answers is not shared
+    assert sum(football.app.matchday_answers[key]['answer'].values()) > 0
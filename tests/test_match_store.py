@@ -0,0 +1,62 @@
+import pandas as pd
+import pytest
+
+import app as football
+from conftest import reset_caches
+
+LEAGUE = "Spanish La Liga"
+
+def import_matches(*leagues):
+    args = ['import-matches'] + [arg for league in leagues for arg in ('--league', league)]
+    result = football.app.test_cli_runner().invoke(args=args)
+    assert result.exit_code == 0, result.output
+    reset_caches()
+
+def csv_frame(league):
+    return football.normalize_league_frame(pd.read_csv(football.get_league_path(league)))[0]
+
+@pytest.mark.parametrize('league', list(football.LEAGUE_FILES))
+def test_store_frame_matches_csv(data_dir, league):
+    import_matches(league)
+    assert football.store_serves(league)
+    # Read from the store, then from the column cache built from it
+    for _ in range(2):
+        reset_caches()
+        pd.testing.assert_frame_equal(football.load_league(league).reset_index(drop=True), csv_frame(league),
+                                      check_categorical=False)
+
+@pytest.mark.parametrize('filters', [
+    {'season': '2019-2020'},
+    {'season': '2019-2020', 'md': 7},
+    {'team': 'Barcelona'},
+    {'team': 'Barcelona', 'start': '2021-01-01', 'end': '2021-12-31 23:59'},
+    {'start': '2023-10-20', 'end': '2023-10-23'}
+])
+def test_store_queries_match_csv(data_dir, filters):
+    columns = ['Date', 'Season', 'MD', 'Home', 'Away', 'FTR', 'HmOd']
+    from_csv = football.query_matches(LEAGUE, columns, **filters)
+    import_matches(LEAGUE)
+    from_store = football.query_matches(LEAGUE, columns, **filters)
+    assert len(from_csv) > 0
+    pd.testing.assert_frame_equal(from_store, from_csv, check_categorical=False)
+
+def test_get_data_is_the_same_from_store_and_csv(data_dir):
+    client = football.app.test_client()
+    from_csv = client.get(f"/get_data/{LEAGUE}").get_json()
+    import_matches(LEAGUE)
+    assert client.get(f"/get_data/{LEAGUE}").get_json() == from_csv
+
+def test_changed_csv_is_read_instead_of_the_import(data_dir):
+    import_matches(LEAGUE)
+    file_path = football.get_league_path(LEAGUE)
+    imported = len(football.load_league(LEAGUE))
+    
+    raw = pd.read_csv(file_path)
+    raw.iloc[1:].to_csv(file_path, index=False)
+    assert not football.store_serves(LEAGUE)
+    assert football.get_data_signature(file_path) == football.get_file_signature(file_path)
+    assert len(football.load_league(LEAGUE)) == imported - 1
+    
+    import_matches(LEAGUE)
+    assert football.store_serves(LEAGUE)
+    assert len(football.load_league(LEAGUE)) == imported - 1
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+import app as football
+
+def exact_matching_games(odds, threshold=0.05):
+    """The grouping find_matching_games replaces: every game against every group key"""
+    groups = {}  # {sorted odds of the group's first game: [game_indices]}
+    for i, game in enumerate(odds):
+        if any(np.isnan(game)):
+            continue
+        key = tuple(sorted(game))
+        for group_key, indices in groups.items():
+            if football.are_odds_similar(key, group_key, threshold):
+                indices.append(i)
+                break
+        else:
+            groups[key] = [i]
+    matching = [indices for indices in groups.values() if len(indices) > 1]
+    return {i: football.get_color_code(idx) for idx, indices in enumerate(matching) for i in indices}
+
+@pytest.mark.parametrize('seed', range(5))
+def test_grid_grouping_matches_exact_grouping(seed):
+    rng = np.random.default_rng(seed)
+    # Two-decimal odds put many pairs exactly on the threshold
+    odds = [tuple(row) for row in np.round(rng.uniform(1.2, 2.2, size=(400, 3)), 2).tolist()]
+    odds[7] = (np.nan, 3.1, 2.0)
+    assert football.find_matching_games(odds) == exact_matching_games(odds)
+    assert football.find_matching_games(odds, threshold=0.2) == exact_matching_games(odds, threshold=0.2)
+
+@pytest.mark.parametrize('league', ["English Premier League", "Spanish La Liga"])
+def test_grid_grouping_matches_exact_grouping_on_league_odds(data_dir, league):
+    df = football.load_league(league)
+    for _, season in df.groupby('Season', observed=True):
+        odds = list(zip(*(column.tolist() for column in football.get_odds(season))))
+        assert football.find_matching_games(odds) == exact_matching_games(odds)
+
+def test_odds_index_finds_every_similar_match(data_dir):
+    index = football.get_odds_index()
+    rows = index.rows[['home', 'draw', 'away']].to_numpy(dtype=np.float64)
+    rng = np.random.default_rng(0)
+    for target in rows[rng.choice(len(rows), 25, replace=False)]:
+        expected = {i for i, row in enumerate(rows) if football.are_odds_similar(row, target, index.threshold)}
+        found = index.query(target[::-1])
+        assert set(found.tolist()) == expected
+        assert len(found) == len(expected)
@@ -0,0 +1,54 @@
+import gzip
+import json
+
+import app as football
+
+LEAGUE = "English Premier League"
+SEASON = "2023-2024"
+
+def get(client, **headers):
+    return client.get(f"/get_data/{LEAGUE}", query_string={'season': SEASON}, headers=headers)
+
+def wait_for_recompression():
+    # The recompress pool has a single thread, so this runs after every pending swap
+    football.response_cache._get_recompress_pool().submit(lambda: None).result()
+
+def test_codings_carry_the_same_body_with_distinct_etags(data_dir):
+    client = football.app.test_client()
+    identity = get(client, **{'Accept-Encoding': 'identity'})
+    gzipped = get(client, **{'Accept-Encoding': 'gzip'})
+    assert identity.status_code == gzipped.status_code == 200
+    assert 'Content-Encoding' not in identity.headers
+    assert gzipped.headers['Content-Encoding'] == 'gzip'
+    assert json.loads(gzip.decompress(gzipped.data)) == identity.get_json()
+    assert identity.headers['ETag'] != gzipped.headers['ETag']
+    assert gzipped.headers['Vary'] == 'Accept-Encoding, Accept'
+
+def test_if_none_match_answers_304(data_dir):
+    client = football.app.test_client()
+    first = get(client, **{'Accept-Encoding': 'gzip'})
+    etag = first.headers['ETag']
+    
+    again = get(client, **{'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+    assert again.status_code == 304
+    assert again.data == b''
+    assert again.headers['ETag'] == etag
+    
+    stale = get(client, **{'Accept-Encoding': 'gzip', 'If-None-Match': '"something-else"'})
+    assert stale.status_code == 200
+
+def test_fast_etags_still_match_after_recompression(data_dir):
+    client = football.app.test_client()
+    fast = get(client, **{'Accept-Encoding': 'gzip'})
+    assert fast.headers['ETag'].endswith('-fast"')
+    wait_for_recompression()
+    
+    best = get(client, **{'Accept-Encoding': 'gzip'})
+    assert best.status_code == 200
+    assert not best.headers['ETag'].endswith('-fast"')
+    assert best.headers['ETag'] != fast.headers['ETag']
+    assert gzip.decompress(best.data) == gzip.decompress(fast.data)
+    
+    revalidated = get(client, **{'Accept-Encoding': 'gzip', 'If-None-Match': fast.headers['ETag']})
+    assert revalidated.status_code == 304
+    assert revalidated.headers['ETag'] == best.headers['ETag']
@@ -0,0 +1,72 @@
+import app as football
+
+def make_result(n_matches):
+    matches = [{'home_team': f"Home {i}", 'away_team': f"Away {i}", 'date': '2024-01-01'} for i in range(n_matches)]
+    return {'seasons': ['2023-2024'], 'matchdays': {'2023-2024-01': {'matches': matches}}}
+
+def entry_size(result, checkpoints=None):
+    return football.estimate_result_size(result) + football.estimate_size(checkpoints or {}, set())
+
+def test_stale_versions_miss():
+    cache = football.SeasonCache(max_mb=1)
+    cache.put(('L', 'S'), 1, make_result(3), {}, {})
+    assert cache.get(('L', 'S'), 1) is not None
+    assert cache.get(('L', 'S'), 2) is None
+    assert cache.get(('L', 'other'), 1) is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+def test_least_recently_used_season_is_evicted():
+    result = make_result(20)
+    size = entry_size(result)
+    cache = football.SeasonCache(max_mb=(2.5 * size) / (1024 * 1024))
+    cache.put(('L', 'a'), 1, make_result(20), {}, {})
+    cache.put(('L', 'b'), 1, make_result(20), {}, {})
+    assert cache.get(('L', 'a'), 1) is not None  # 'b' is now the oldest
+    cache.put(('L', 'c'), 1, make_result(20), {}, {})
+    
+    assert cache.get(('L', 'b'), 1) is None
+    assert cache.get(('L', 'a'), 1) is not None
+    assert cache.get(('L', 'c'), 1) is not None
+    assert cache.evictions == 1
+    assert cache.size_bytes == 2 * size <= cache.max_bytes
+    assert cache.stats()['entries'] == 2
+
+def test_replacing_a_season_does_not_double_count():
+    cache = football.SeasonCache(max_mb=1)
+    cache.put(('L', 'a'), 1, make_result(5), {}, {})
+    cache.put(('L', 'a'), 2, make_result(10), {}, {})
+    assert cache.size_bytes == entry_size(make_result(10))
+    assert cache.get(('L', 'a'), 2) is not None
+
+def test_seasons_over_the_budget_are_not_kept():
+    result = make_result(50)
+    cache = football.SeasonCache(max_mb=(entry_size(result) / 2) / (1024 * 1024))
+    cache.put(('L', 'a'), 1, result, {}, {})
+    assert cache.get(('L', 'a'), 1) is None
+    assert cache.size_bytes == 0
+    assert cache.evictions == 0
+
+def test_shared_checkpoint_states_are_counted_once():
+    state = {'points': list(range(100))}
+    shared = {'md1': state, 'md2': state, 'md3': state}
+    copied = {'md1': state, 'md2': dict(state), 'md3': dict(state)}
+    assert football.estimate_size(shared, set()) < football.estimate_size(copied, set())
+    
+    cache = football.SeasonCache(max_mb=1)
+    cache.put(('L', 'a'), 1, make_result(5), {}, shared)
+    assert cache.size_bytes == entry_size(make_result(5), shared)
+
+def test_get_data_serves_evicted_seasons_again(data_dir, monkeypatch):
+    league = "English Premier League"
+    client = football.app.test_client()
+    first = client.get(f"/get_data/{league}", query_string={'season': '2022-2023'}).get_json()
+    # Room for about one formatted season
+    monkeypatch.setattr(football, 'season_cache', football.SeasonCache(max_mb=football.season_cache.size_bytes * 1.5 / (1024 * 1024)))
+    
+    for season in ['2022-2023', '2023-2024', '2022-2023']:
+        football.response_cache.clear()
+        response = client.get(f"/get_data/{league}", query_string={'season': season})
+        assert response.status_code == 200
+    assert football.season_cache.evictions >= 1
+    assert football.season_cache.misses == 3
+    assert response.get_json() == first
@@ -1,4 +1,19 @@
-from app import app
+import gc
+import os
+
+from app import app, warm_up
+
+# Warm every league before gunicorn forks its workers (run gunicorn with --preload).
+# Set WARM_UP=0 to skip, or WARM_UP_BACKGROUND=1 to warm up each worker in a thread once it
+# has started (gunicorn.conf.py's post_fork hook), so workers answer /ready with 503 meanwhile.
+# The thread is never started here: under --preload it would run in the master, and forked
+# workers would inherit its 'running' state and held locks but not the thread itself.
+if os.environ.get('WARM_UP', '1') != '0' and os.environ.get('WARM_UP_BACKGROUND') != '1':
+    warm_up()
+    # Keep the garbage collector from touching (and so copying) the shared pages
+    gc.freeze()
 
 if __name__ == "__main__":
+    if os.environ.get('WARM_UP', '1') != '0' and os.environ.get('WARM_UP_BACKGROUND') == '1':
+        warm_up(background=True)
     app.run()